@@ -0,0 +1,298 @@
+"""Walk-forward backtest of the volatility and volume models.
+
+    python backtest.py --start 2022-01-01 --end 2025-01-01 --workers 16
+
+For every ticker in sp500.csv and every trading day in [start, end] (or
+every --step-th day), the 30-day feature window is rebuilt from the bars
+up to that day and the macro values released by then, both models are
+run on it, and the forecast is scored against what happened --horizon
+trading days later:
+
+    volatility  that day's Volatility_5d, the std of the last 5 daily
+                Close returns, as the model is trained to forecast
+    volume      that day's Volume
+
+Tickers are split into shards that run on a process pool, each worker
+with its own model registry and a single torch thread. The workers only
+read local stores: prices are topped up once in the parent first. With
+--archive they map the history archive (history_archive.py) instead, so
+all of them share one copy of the prices in the OS cache.
+
+No input falls back to today's values. Macro series are refreshed
+first, and a day before a series' first release gets zero. There is no
+history of sentiment_score or of the event codes, so they are neutral
+(zero, no event) on every date. Nor is there a history of the firm
+metrics (book-to-market, dividend yield, margins, returns,
+balance-sheet ratios), only today's FMP profiles, so the scored
+baseline leaves them at zero as for a ticker without a profile;
+--firm-metrics puts today's values on every date instead.
+summary.json lists what was zero-filled, per column and share of
+dates, under "zero_filled", and every input that was not known on the
+forecast date under "look_ahead". History goes back as far as the
+price store has it, five years on first fetch.
+
+Writes backtests/<timestamp>/predictions.csv and summary.json with, per
+model and overall, per year and per ticker: MAE, RMSE, directional
+accuracy against the last value in the window, and correlation.
+"""
+import argparse
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import FIRM_COLS, build_history_tensors
+from history_archive import build_archive, open_archive
+from http_client import configure
+from inference_optim import set_inference_threads
+from macro_store import get_macro_store, SERIES_IDS
+from price_store import get_price_store
+from providers import company_metrics_from_profile, fetch_profiles
+from replay import install_from_env
+
+
+BACKTESTS_DIR = "backtests"
+MODELS = ("volatility", "volume")
+DEFAULT_SHARD_SIZE = 8
+DEFAULT_BATCH_SIZE = 2048
+
+
+def realized(prices: pd.DataFrame) -> dict:
+    """Per-day value each model forecasts, aligned with the prices index.
+
+    Volatility is computed like the Volatility_5d feature: std (ddof=1) of
+    the 5 daily Close returns up to and including the day.
+    """
+    return {
+        "volatility": prices["Close"].pct_change().rolling(5).std().to_numpy(np.float64),
+        "volume": prices["Volume"].to_numpy(np.float64),
+    }
+
+
+# ----------------------- workers -----------------------
+def _init_worker(threads: int):
+    # One torch thread per process; the pool provides the parallelism
+    set_inference_threads(threads)
+
+
+def _predict(registry, name: str, X: np.ndarray, batch_size: int) -> np.ndarray:
+    if len(X) == 0:
+        return np.empty(0, dtype=np.float32)
+    return np.concatenate([
+        registry.predict(name, X[i:i + batch_size])[:, 0] for i in range(0, len(X), batch_size)
+    ])
+
+
+def run_shard(tickers: list, macro: pd.DataFrame, firm_data: dict, start, end,
+              horizon: int = 1, step: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+              use_archive: bool = False) -> pd.DataFrame:
+    """Forecast rows (ticker, date, target_date, model, predicted, actual, last) for one shard.
+
+    With use_archive, prices are read from the history archive every worker
+    maps, instead of unpickling each ticker from the price store.
+    """
+    from model_registry import get_registry
+    registry = get_registry()
+    store = get_price_store()
+    archive = open_archive(required=True) if use_archive else None
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    frames = []
+    for ticker in tickers:
+        if archive is not None:
+            prices = archive.frame(ticker) if ticker in archive else None
+        else:
+            prices = store.stored(ticker)
+        if prices is None:
+            continue
+        prices = prices.dropna()
+        if prices.index.tz is not None:
+            prices.index = prices.index.tz_localize(None)
+        dates, tensors = build_history_tensors(prices, macro, firm_data.get(ticker, {}))
+        if len(dates) == 0:
+            continue
+
+        # Window i ends at prices row i + LOOKBACK_DAYS - 1; its target is `horizon` rows later
+        first = len(prices) - len(dates)
+        ends = np.arange(len(dates)) + first
+        keep = (ends + horizon < len(prices)) & (dates >= start) & (dates <= end)
+        keep &= (np.cumsum(keep) - 1) % step == 0
+        if not keep.any():
+            continue
+        ends = ends[keep]
+        values = realized(prices)
+
+        for name in MODELS:
+            frames.append(pd.DataFrame({
+                "ticker": ticker,
+                "date": prices.index[ends],
+                "target_date": prices.index[ends + horizon],
+                "model": name,
+                "predicted": _predict(registry, name, tensors[name][keep], batch_size),
+                "actual": values[name][ends + horizon],
+                "last": values[name][ends],
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# ----------------------- scoring -----------------------
+def score(df: pd.DataFrame) -> dict:
+    error = df["predicted"] - df["actual"]
+    direction = np.sign(df["predicted"] - df["last"]) == np.sign(df["actual"] - df["last"])
+    return {
+        "n": int(len(df)),
+        "mae": float(error.abs().mean()),
+        "rmse": float(np.sqrt((error ** 2).mean())),
+        "directional_accuracy": float(direction.mean()),
+        "correlation": float(df["predicted"].corr(df["actual"])) if len(df) > 1 else float("nan"),
+    }
+
+
+def summarize(predictions: pd.DataFrame) -> dict:
+    summary = {}
+    for name, df in predictions.groupby("model"):
+        summary[name] = {
+            "overall": score(df),
+            "by_year": {str(year): score(g) for year, g in df.groupby(df["date"].dt.year)},
+            "by_ticker": {ticker: score(g) for ticker, g in df.groupby("ticker")},
+        }
+    return summary
+
+
+# ----------------------- driver -----------------------
+def prepare(tickers: list, refresh: bool = True, use_archive: bool = False, firm_metrics: bool = False):
+    """Top up prices once, then build the inputs every shard shares: as-of macro and firm metrics.
+
+    With use_archive the history archive is rebuilt from the topped-up
+    store (or used as it is without refresh) for the workers to map.
+    Macro days before a series' first release are zero, and firm
+    metrics are empty unless firm_metrics, which fetches today's profiles
+    (look-ahead, see the module docstring). Returns (macro, firm_data,
+    inputs), inputs being what input_report() gives.
+    """
+    store = get_price_store()
+    if refresh:
+        store.history_many(tickers, interval="1d", days=1, backfill=True)
+    dates = set()
+    if use_archive:
+        if refresh or open_archive() is None:
+            build_archive(tickers)
+        dates.update(open_archive(reload=True, required=True).dates.normalize())
+    else:
+        for t in tickers:
+            stored = store.stored(t)
+            if stored is not None:
+                index = stored.index.tz_localize(None) if stored.index.tz is not None else stored.index
+                dates.update(index.normalize())
+    macro_store = get_macro_store()
+    if refresh:
+        for series_id in SERIES_IDS.values():
+            try:
+                macro_store.update(series_id)
+            except Exception:
+                pass    # the series stays as stored; its gaps show up in zero_filled
+    # No fallback row: today's values must not stand in for unreleased ones
+    macro = macro_store.as_of(sorted(dates))
+    inputs = input_report(macro.isna().mean(), firm_metrics)
+    macro = macro.fillna(0.0)
+    macro["sentiment_score"] = 0.0
+    if not firm_metrics:
+        return macro, {t: {} for t in tickers}, inputs
+    try:
+        profiles = fetch_profiles(tickers)
+    except Exception:
+        profiles = {}
+    firm_data = {t: company_metrics_from_profile(profiles.get(t.upper())) for t in tickers}
+    return macro, firm_data, inputs
+
+
+def input_report(unreleased: pd.Series, firm_metrics: bool) -> dict:
+    """look_ahead: inputs not known on the forecast date; zero_filled: column -> share of dates zeroed.
+
+    unreleased is the share of dates each macro column has no released
+    value for.
+    """
+    look_ahead = []
+    if firm_metrics:
+        look_ahead.append(f"{', '.join(FIRM_COLS)}: today's FMP profile values on every date")
+    revised = [col for col, share in unreleased.items() if share < 1]
+    if revised:
+        # The store keeps the latest revision of each observation, not its first release
+        look_ahead.append(f"{', '.join(revised)}: latest FRED revisions rather than first releases")
+
+    zero_filled = {col: float(share) for col, share in unreleased.items() if share > 0}
+    zero_filled["sentiment_score"] = 1.0
+    if not firm_metrics:
+        zero_filled.update({col: 1.0 for col in FIRM_COLS})
+    return {"look_ahead": look_ahead, "zero_filled": zero_filled}
+
+
+def run(tickers: list, start, end, horizon: int = 1, step: int = 1, workers: int = None,
+        shard_size: int = DEFAULT_SHARD_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+        refresh: bool = True, use_archive: bool = False, firm_metrics: bool = False) -> tuple:
+    """(predictions, inputs) where inputs is prepare()'s input report."""
+    macro, firm_data, inputs = prepare(tickers, refresh, use_archive, firm_metrics)
+    shards = [tickers[i:i + shard_size] for i in range(0, len(tickers), shard_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(1,)) as pool:
+        futures = [
+            pool.submit(run_shard, shard, macro, {t: firm_data[t] for t in shard},
+                        start, end, horizon, step, batch_size, use_archive)
+            for shard in shards
+        ]
+        frames = [f.result() for f in futures]
+    frames = [f for f in frames if not f.empty]
+    predictions = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=["ticker", "date", "target_date", "model", "predicted", "actual", "last"])
+    return predictions, inputs
+
+
+def write_results(predictions: pd.DataFrame, summary: dict, args: dict, directory: str = BACKTESTS_DIR,
+                  inputs: dict = None) -> str:
+    run_dir = os.path.join(directory, datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+    predictions.to_csv(os.path.join(run_dir, "predictions.csv"), index=False)
+    with open(os.path.join(run_dir, "summary.json"), "w") as f:
+        json.dump({"args": args, **(inputs or {}), "summary": summary}, f, indent=2, default=str)
+    return run_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    today = datetime.date.today()
+    parser.add_argument("--start", default=str(today.replace(year=today.year - 3)))
+    parser.add_argument("--end", default=str(today))
+    parser.add_argument("--tickers", nargs="+", help="defaults to every ticker in sp500.csv")
+    parser.add_argument("--horizon", type=int, default=1, help="trading days ahead being forecast")
+    parser.add_argument("--step", type=int, default=1, help="score every n-th trading day")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--no-refresh", action="store_true", help="use stored prices as they are")
+    parser.add_argument("--archive", action="store_true",
+                        help="read prices from the memory-mapped history archive (rebuilt unless --no-refresh)")
+    parser.add_argument("--firm-metrics", action="store_true",
+                        help="use today's FMP firm metrics on every date (look-ahead, flagged in summary.json)")
+    parser.add_argument("--out", default=BACKTESTS_DIR)
+    parser.add_argument("--fmp-api-key", help="defaults to $FMP_API_KEY or st.secrets")
+    args = parser.parse_args()
+
+    if args.fmp_api_key:
+        configure("fmp", api_key=args.fmp_api_key)
+    install_from_env()
+    tickers = args.tickers or pd.read_csv("sp500.csv")["ticker"].dropna().tolist()
+
+    predictions, inputs = run(tickers, args.start, args.end, args.horizon, args.step, args.workers,
+                              args.shard_size, args.batch_size, refresh=not args.no_refresh,
+                              use_archive=args.archive, firm_metrics=args.firm_metrics)
+    summary = summarize(predictions)
+    run_dir = write_results(predictions, summary, vars(args), args.out, inputs)
+    for leak in inputs["look_ahead"]:
+        print(f"Look-ahead: {leak}")
+    for name, result in summary.items():
+        overall = result["overall"]
+        print(f"{name:<10} n={overall['n']:<8} MAE {overall['mae']:.4g}  RMSE {overall['rmse']:.4g}  "
+              f"direction {overall['directional_accuracy']:.1%}  corr {overall['correlation']:.3f}")
+    print(f"Wrote {run_dir}")
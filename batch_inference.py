@@ -0,0 +1,79 @@
+"""Nightly batched inference over the sp500.csv universe.
+
+    python batch_inference.py --batch-size 256
+
+Builds the 30-day feature windows for every ticker, runs both LSTM models
+in large batches and writes a versioned table under predictions/ that
+page1 looks up instead of predicting on demand.
+"""
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from features import build_feature_tensors
+from http_client import configure
+from macro_store import get_macro_store
+from model_registry import get_registry
+from prediction_table import write_table, PREDICTIONS_DIR
+from price_store import get_price_store
+from providers import company_metrics_from_profile, fetch_profiles
+from replay import install_from_env
+
+
+def load_universe(path: str = "sp500.csv") -> list:
+    return pd.read_csv(path)["ticker"].dropna().tolist()
+
+
+def build_feature_batches(tickers: list):
+    """Feature tensors for every ticker with a full lookback window."""
+    prices = get_price_store().history_many(tickers, interval="1d", days=60)
+    # Each day of the window gets the macro values known on that day
+    dates = pd.DatetimeIndex(sorted({d for df in prices.values() if df is not None for d in df.index}))
+    macro = get_macro_store().as_of(dates, fallback=pd.read_csv("realtime_marco.csv").iloc[-1])
+    profiles = fetch_profiles(tickers)
+    firm_data = {t: company_metrics_from_profile(profiles.get(t.upper())) for t in prices}
+
+    kept, tensors = build_feature_tensors(prices, macro, firm_data)
+    as_of = [prices[t].dropna().index[-1].strftime("%Y-%m-%d") for t in kept]
+    return [t.upper() for t in kept], as_of, tensors["volatility"], tensors["volume"]
+
+
+def predict_in_batches(registry, name: str, X: np.ndarray, batch_size: int) -> np.ndarray:
+    outputs = [
+        registry.predict(name, X[start:start + batch_size])
+        for start in range(0, len(X), batch_size)
+    ]
+    return np.concatenate(outputs)[:, 0]
+
+
+def run(batch_size: int, directory: str = PREDICTIONS_DIR) -> str:
+    registry = get_registry()
+    tickers, as_of, X_volatility, X_volume = build_feature_batches(load_universe())
+
+    versions = {name: registry.version(name) for name in ("volatility", "volume")}
+    table = pd.DataFrame({
+        "ticker": tickers,
+        "as_of": as_of,
+        "predicted_volatility": predict_in_batches(registry, "volatility", X_volatility, batch_size),
+        "predicted_volume": predict_in_batches(registry, "volume", X_volume, batch_size),
+        "volatility_model_version": versions["volatility"],
+        "volume_model_version": versions["volume"],
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    })
+    return write_table(table, versions, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--out", default=PREDICTIONS_DIR)
+    parser.add_argument("--fmp-api-key", help="defaults to $FMP_API_KEY or st.secrets")
+    args = parser.parse_args()
+
+    if args.fmp_api_key:
+        configure("fmp", api_key=args.fmp_api_key)
+    install_from_env()   # DATA_PROVIDER_MODE=replay runs the batch offline
+    path = run(args.batch_size, args.out)
+    print(f"Wrote {path}")
@@ -0,0 +1,80 @@
+"""Drift of StatefulPredictor's one-bar updates from a full window recompute.
+
+    python benchmarks/bench_incremental.py --tickers 20 --days 120
+
+Walks synthetic daily histories forward one bar at a time through a
+StatefulPredictor, and on every bar also runs the full LOOKBACK_DAYS
+window through the same float model. Prints, for each number of
+incremental steps since the last full recompute, the largest absolute
+deviation and that deviation as a fraction of the largest prediction,
+then the figure at REPRIME_AFTER. With --max-relative it exits with
+status 1 when the drift at any step count exceeds that fraction.
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures  # noqa: E402
+from features import build_history_tensors  # noqa: E402
+from incremental_inference import REPRIME_AFTER, StatefulPredictor  # noqa: E402
+from model_registry import MODEL_FILES, ModelRegistry  # noqa: E402
+from providers import company_metrics_from_profile  # noqa: E402
+
+
+def walk_forward(registry, name: str, histories: dict, reprime_after: int = REPRIME_AFTER) -> dict:
+    """{steps since full recompute: (max abs deviation, max abs full prediction)}"""
+    predictor = StatefulPredictor(registry, name, reprime_after)
+    tickers = list(histories)
+    days = min(len(X) for X in histories.values())
+    drift = defaultdict(lambda: [0.0, 0.0])
+    for d in range(days):
+        X = np.stack([histories[t][d] for t in tickers])
+        incremental = predictor.update_many(tickers, X)
+        full = registry.predict(name, X)[:, 0]
+        for t, a, b in zip(tickers, incremental, full):
+            entry = drift[predictor.steps_since_full(t)]
+            entry[0] = max(entry[0], abs(float(a) - float(b)))
+            entry[1] = max(entry[1], abs(float(b)))
+    return {steps: tuple(entry) for steps, entry in sorted(drift.items())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--days", type=int, default=120, help="bars walked per ticker")
+    parser.add_argument("--reprime-after", type=int, default=REPRIME_AFTER)
+    parser.add_argument("--max-relative", type=float, default=None)
+    args = parser.parse_args()
+
+    registry = ModelRegistry("float")
+    for name, path in MODEL_FILES.items():
+        registry.register(name, os.path.join(fixtures.REPO_DIR, path))
+    macro = pd.read_csv(os.path.join(fixtures.REPO_DIR, "realtime_marco.csv")).iloc[-1]
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+
+    failed = False
+    for name in MODEL_FILES:
+        histories = {}
+        for t in symbols:
+            firm = company_metrics_from_profile(fixtures.synthetic_profile(t))
+            _, tensors = build_history_tensors(fixtures.synthetic_prices(t), macro, firm, [name])
+            histories[t] = tensors[name][-args.days:]
+        drift = walk_forward(registry, name, histories, args.reprime_after)
+
+        print(f"{name}:")
+        print(f"  {'steps':>5}  {'max abs':>12}  {'relative':>8}")
+        for steps, (deviation, scale) in drift.items():
+            relative = deviation / (scale or 1.0)
+            failed |= args.max_relative is not None and relative > args.max_relative
+            print(f"  {steps:>5}  {deviation:12.6g}  {relative:8.4f}")
+        deviation, scale = drift.get(args.reprime_after, (float("nan"), 1.0))
+        print(f"  at REPRIME_AFTER={args.reprime_after}: max abs {deviation:.6g}, "
+              f"relative {deviation / (scale or 1.0):.4f}")
+
+    sys.exit(1 if failed else 0)
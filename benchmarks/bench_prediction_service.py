@@ -0,0 +1,78 @@
+"""Throughput of the local prediction service under concurrent clients.
+
+    python benchmarks/bench_prediction_service.py --clients 1 8 32 --requests 200
+
+Starts the service in-process on a free localhost port and sends 30-day
+feature windows built the way page1 builds them (from the synthetic
+fixtures) from N client threads. For each client count it reports
+requests/s, p50/p95 latency and the average micro-batch size.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import REPO_DIR, synthetic_feature_windows  # noqa: E402
+from prediction_service import PredictionClient, PredictionService  # noqa: E402
+
+
+def run_clients(url: str, model: str, windows: list, clients: int, requests_per_client: int) -> list:
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        client = PredictionClient(url)
+        local = []
+        for i in range(requests_per_client):
+            X = windows[(seed + i) % len(windows)]
+            start = time.perf_counter()
+            client.predict(model, X)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=100, help="requests per client")
+    parser.add_argument("--model", default="volatility")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--tickers", type=int, default=50, help="distinct feature windows to cycle through")
+    args = parser.parse_args()
+
+    tickers = pd.read_csv(os.path.join(REPO_DIR, "sp500.csv"))["ticker"].dropna().tolist()[:args.tickers]
+    windows = [features[args.model] for features in synthetic_feature_windows(tickers)]
+
+    service = PredictionService(port=0, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).start()
+    input_size = service.registry.input_size(args.model)
+    if windows[0].shape[-1] != input_size:
+        sys.exit(f"page features are {windows[0].shape[-1]} wide, {args.model} expects {input_size}")
+    batcher = service.batchers[args.model]
+
+    print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>10}")
+    for clients in args.clients:
+        requests_before, batches_before = batcher.requests, batcher.batches
+        start = time.perf_counter()
+        latencies = run_clients(service.url, args.model, windows, clients, args.requests)
+        elapsed = time.perf_counter() - start
+        batches = batcher.batches - batches_before
+        avg_batch = (batcher.requests - requests_before) / batches if batches else 0.0
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"{clients:>8} {len(latencies) / elapsed:>10.1f} {p50:>8.2f} {p95:>8.2f} {avg_batch:>10.1f}")
+
+    service.shutdown()
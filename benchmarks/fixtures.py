@@ -0,0 +1,125 @@
+"""Offline stand-ins for FMP, Finnhub, FRED, Alpha Vantage and Yahoo.
+
+benchmarks/fixtures/ is a replay.py cassette store; fill it with
+`python benchmarks/run_benchmarks.py --record`. Any request without a
+cassette gets a deterministic synthetic response with the same shape,
+seeded by the request, so the suite also runs from a fresh checkout with
+no network access at all.
+"""
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay  # noqa: E402
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic data ends here so every run sees the same bars
+SYNTHETIC_END = pd.Timestamp("2025-04-30")
+
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Industrials",
+           "Consumer Cyclical", "Consumer Defensive", "Utilities", "Real Estate"]
+
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+# ----------------------- synthetic responses -----------------------
+def _symbols(path: str, prefix: str) -> list:
+    return [s for s in path[len(prefix):].split(",") if s]
+
+
+def synthetic_profile(symbol: str) -> dict:
+    rng = np.random.default_rng(_seed("profile", symbol))
+    price = float(rng.uniform(20, 500))
+    return {
+        "symbol": symbol,
+        "companyName": f"{symbol} Inc.",
+        "sector": SECTORS[_seed("sector", symbol) % len(SECTORS)],
+        "industry": "Synthetic",
+        "website": f"https://www.{symbol.lower()}.example",
+        "image": "",
+        "price": price,
+        "beta": float(rng.uniform(0.5, 1.8)),
+        "lastDividend": float(rng.uniform(0, 3)),
+        "marketCap": float(price * rng.uniform(1e8, 1e10)),
+        "averageVolume": float(rng.uniform(1e6, 5e7)),
+    }
+
+
+def _synthetic_observations(series_id: str) -> list:
+    rng = np.random.default_rng(_seed("fred", series_id))
+    dates = pd.date_range(end=SYNTHETIC_END, periods=120, freq="MS")
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    return [{"date": d.strftime("%Y-%m-%d"), "value": f"{v:.3f}"} for d, v in zip(dates, values)]
+
+
+def synthetic_response(provider: str, path: str, params: dict = None):
+    params = params or {}
+    if provider == "fmp" and path.startswith("/profile/"):
+        return [synthetic_profile(s) for s in _symbols(path, "/profile/")]
+    if provider == "fmp" and path.startswith("/key-metrics/"):
+        rng = np.random.default_rng(_seed("metrics", path))
+        return [{"returnOnTangibleAssets": float(rng.uniform(0, 0.2)), "roe": float(rng.uniform(0, 0.4)),
+                 "dividendYield": float(rng.uniform(0, 0.04))}]
+    if provider == "finnhub" and path == "/company-news":
+        symbol = params.get("symbol")
+        return [{"headline": f"{symbol} headline {i}", "url": f"https://news.example/{symbol}/{i}"} for i in range(10)]
+    if provider == "fred" and path == "/series/observations":
+        observations = _synthetic_observations(params.get("series_id"))
+        start = params.get("observation_start")
+        return {"observations": [o for o in observations if start is None or o["date"] >= start]}
+    if provider == "alphavantage" and params.get("function") == "DIVIDENDS":
+        rng = np.random.default_rng(_seed("dividends", params.get("symbol")))
+        return {"data": [{"amount": f"{rng.uniform(0.1, 1.5):.2f}"}]}
+    raise KeyError(f"No fixture for {provider} {path}")
+
+
+def synthetic_prices(ticker: str, interval: str = "1d") -> pd.DataFrame:
+    if interval == "1h":
+        days = pd.bdate_range(end=SYNTHETIC_END, periods=500)
+        index = pd.DatetimeIndex([d + pd.Timedelta(hours=h, minutes=30) for d in days for h in range(9, 16)])
+    else:
+        index = pd.bdate_range(end=SYNTHETIC_END, periods=5 * 252)
+    rng = np.random.default_rng(_seed("prices", ticker, interval))
+    close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0, 0.015, len(index))))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.003, len(index))),
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype(float),
+    }, index=index)
+
+
+def synthetic_feature_windows(tickers: list) -> list:
+    """assemble_features() output per ticker, as page1 builds it, from synthetic prices and profiles."""
+    from features import assemble_features
+    from providers import company_metrics_from_profile
+    macro = pd.read_csv(os.path.join(REPO_DIR, "realtime_marco.csv")).iloc[-1]
+    return [assemble_features(synthetic_prices(t), macro, company_metrics_from_profile(synthetic_profile(t)))
+            for t in tickers]
+
+
+# ----------------------- install -----------------------
+def install(latency_ms=None, error_rate=None, seed: int = 0):
+    """Replay FIXTURES_DIR under every provider call, synthesizing whatever is not recorded."""
+    return replay.install("replay", FIXTURES_DIR, latency_ms=latency_ms, error_rate=error_rate, seed=seed,
+                          http_fallback=synthetic_response, prices_fallback=synthetic_prices)
+
+
+def install_recorder():
+    """Record live responses into FIXTURES_DIR."""
+    return replay.install("record", FIXTURES_DIR)
+
+
+def uninstall():
+    replay.install("live")
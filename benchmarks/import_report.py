@@ -0,0 +1,81 @@
+"""What each page costs to import, from a cold interpreter.
+
+    python benchmarks/import_report.py                 # every page
+    python benchmarks/import_report.py page1.py --top 15
+
+For each page this runs the page's top-level import statements (not the
+page body, which needs a Streamlit runtime) in a fresh `python -X
+importtime` and reports the wall time and the slowest top-level packages.
+Imports inside functions, such as torch behind load_model_registry(), only
+count on the path that calls them, so they do not show up here; the
+"+ lazy" column adds the imports preload.py does in the background, for
+comparison with what a page would cost without them.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from preload import HEAVY_MODULES  # noqa: E402
+
+
+PAGES = ["streamlit_app.py", "page0.py", "page1.py", "page2.py", "page3.py", "page4.py", "page-1.py"]
+
+
+def top_level_imports(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes) or "pass"
+
+
+def import_times(code: str) -> tuple:
+    """(wall seconds, {top-level package: cumulative seconds}) for running code in a fresh interpreter."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        name = name[1:].rstrip()
+        if not name.startswith(" "):
+            packages[name] = int(cumulative) / 1e6
+    return wall, packages
+
+
+def report(pages: list, top: int):
+    baseline, startup_packages = import_times("pass")
+    print(f"interpreter start-up: {baseline:.2f}s (subtracted below)\n")
+    for page in pages:
+        code = top_level_imports(os.path.join(REPO_DIR, page))
+        try:
+            wall, packages = import_times(code)
+            lazy_wall, _ = import_times(code + "\n" + "\n".join(f"import {m}" for m in HEAVY_MODULES))
+        except RuntimeError as e:
+            print(f"{page}: import failed: {e}\n")
+            continue
+        print(f"{page:<20} imports {wall - baseline:6.2f}s   + lazy {lazy_wall - baseline:6.2f}s")
+        own = {name: seconds for name, seconds in packages.items() if name not in startup_packages}
+        for name, seconds in sorted(own.items(), key=lambda item: -item[1])[:top]:
+            print(f"    {seconds:6.3f}s  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--top", type=int, default=8, help="slowest packages to list per page")
+    args = parser.parse_args()
+    report(args.pages, args.top)
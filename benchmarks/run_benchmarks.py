@@ -0,0 +1,333 @@
+"""End-to-end timings of the app's hot paths, offline.
+
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --compare base.json bench.json
+    python benchmarks/run_benchmarks.py --commits main HEAD
+    python benchmarks/run_benchmarks.py --record            # refresh the fixtures from the live APIs
+
+Every provider request and yf.download is replayed from benchmarks/fixtures
+(see fixtures.py and replay.py), and all local stores live in a temporary
+directory, so runs need no network and never touch data/. --latency-ms
+adds replay latency to every provider call, e.g. "fmp=120,yahoo=400".
+
+Stages:
+    fetch.*            provider calls and the price store, cold caches
+    features.*         page1's prediction features and the batch tensors,
+                       with prices and macro already stored
+    models.load        unpickle, optimize and warm up both models
+    inference.*        one window and a batch of 64 per model
+    related_stocks.*   peer index lookup, batched quotes and SVG sparklines,
+                       cold (saved index loaded from disk) and on a rerun
+
+Each stage reports p50/p95/mean seconds over --iterations runs, plus the
+peak Python allocation (tracemalloc) of one extra run. --compare exits
+with status 1 when a stage's p50 or peak memory grew by more than
+--threshold, so it can gate regressions. --commits checks out both refs
+in temporary worktrees, runs this copy of the suite against each and
+compares them; refs older than replay.py cannot be benchmarked.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import fixtures  # noqa: E402
+import macro_store  # noqa: E402
+import peer_index  # noqa: E402
+import price_store  # noqa: E402
+import sparkline  # noqa: E402
+import ticker_metadata  # noqa: E402
+from batch_inference import build_feature_batches, load_universe  # noqa: E402
+from features import assemble_features  # noqa: E402
+from model_registry import MODEL_FILES, MODEL_VARIANT, ModelRegistry  # noqa: E402
+from providers import (  # noqa: E402
+    company_metrics_from_profile,
+    fetch_profile,
+    fetch_profiles,
+    fetch_related_information,
+)
+from quotes import fetch_related_quotes  # noqa: E402
+from response_cache import response_cache  # noqa: E402
+
+
+TICKERS = ["AAPL", "MSFT", "JPM", "XOM", "JNJ"]
+BATCH_TICKERS = 100
+
+# Stages that read the whole batch universe rather than one ticker of TICKERS
+UNIVERSE_STAGES = ("fetch.profiles_bulk", "features.batch")
+
+
+# ----------------------- isolated state -----------------------
+class Sandbox:
+    """Fresh stores under a temporary directory for every iteration."""
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix="bench-")
+
+    def reset(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        price_store._store = price_store.PriceStore(os.path.join(self.root, "prices"))
+        macro_store._store = macro_store.MacroStore(os.path.join(self.root, "macro"))
+        ticker_metadata.METADATA_PATH = os.path.join(self.root, "ticker_metadata.csv")
+        ticker_metadata._table = None
+        peer_index.PEER_INDEX_PATH = os.path.join(self.root, "peer_index.json")
+        peer_index._index = None
+        response_cache.clear()
+        sparkline._cache.clear()
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ----------------------- stages -----------------------
+def prediction_features(ticker: str) -> dict:
+    # Same path as page1.get_prediction_features
+    df = price_store.get_price_store().history(ticker, interval="1d", days=60)
+    macro = macro_store.get_macro_store().as_of(df.index, fallback=pd.read_csv("realtime_marco.csv").iloc[-1])
+    return assemble_features(df, macro, company_metrics_from_profile(fetch_profile(ticker)))
+
+
+def related_stocks(ticker: str) -> list:
+    # Same path as page1: local peers, one batched quote read, a sparkline per card
+    profile = fetch_profile(ticker)
+    peers = peer_index.find_peers(ticker, profile.get("sector"))
+    return [
+        sparkline.sparkline_svg(q["symbol"], q["last_bar"], q["price_trend"],
+                                "green" if q["change_pct"] >= 0 else "red")
+        for q in fetch_related_quotes(peers, interval="1h", days=7)
+    ]
+
+
+def load_models() -> ModelRegistry:
+    registry = ModelRegistry(MODEL_VARIANT)
+    for name, path in MODEL_FILES.items():
+        registry.register(name, path)
+    return registry
+
+
+def build_stages(sandbox: Sandbox) -> dict:
+    """name -> (setup, run); setup is untimed and returns run's arguments."""
+    universe = load_universe()[:BATCH_TICKERS]
+    cycle = iter(range(10 ** 9))
+
+    def next_ticker():
+        return TICKERS[next(cycle) % len(TICKERS)]
+
+    def cold():
+        sandbox.reset()
+        return (next_ticker(),)
+
+    def cold_universe():
+        sandbox.reset()
+        return (universe,)
+
+    def stored():
+        ticker = next_ticker()
+        sandbox.reset()
+        macro_store.get_macro_store().update_all()
+        price_store.get_price_store().history(ticker, interval="1d", days=60)
+        fetch_profile(ticker)
+        return (ticker,)
+
+    def stored_universe():
+        sandbox.reset()
+        macro_store.get_macro_store().update_all()
+        price_store.get_price_store().history_many(universe, interval="1d", days=60)
+        return (universe,)
+
+    def indexed():
+        # The index is built offline (peer_index.py or the warmer), not on the request path
+        ticker = next_ticker()
+        sandbox.reset()
+        peer_index.build_peer_index(fetch=True).save()
+        return (ticker,)
+
+    def warm_related():
+        (ticker,) = indexed()
+        related_stocks(ticker)
+        return (ticker,)
+
+    stages = {
+        "fetch.profile": (cold, fetch_profile),
+        "fetch.profiles_bulk": (cold_universe, fetch_profiles),
+        "fetch.price_history": (cold, lambda t: price_store.get_price_store().history(t, interval="1d", days=60)),
+        "fetch.related_information": (cold, fetch_related_information),
+        "features.prediction": (stored, prediction_features),
+        "features.batch": (stored_universe, build_feature_batches),
+        "models.load": (lambda: (), load_models),
+        "related_stocks.cold": (indexed, related_stocks),
+        "related_stocks.rerun": (warm_related, related_stocks),
+    }
+
+    registry = load_models()
+    rng = np.random.default_rng(0)
+    for name in registry.names():
+        input_size = registry.input_size(name)
+        for label, batch in (("single", 1), ("batch64", 64)):
+            X = rng.normal(size=(batch, 30, input_size)).astype(np.float32)
+            stages[f"inference.{label}.{name}"] = (
+                lambda X=X: (X,), lambda X, name=name: registry.predict(name, X)
+            )
+    return stages
+
+
+def measure(setup, run, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        args = setup()
+        start = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows everything down, so memory gets a run of its own
+    args = setup()
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        "iterations": iterations,
+        "p50": float(np.percentile(timings, 50)),
+        "p95": float(np.percentile(timings, 95)),
+        "mean": float(timings.mean()),
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_suite(iterations: int, only: list = None, latency_ms=None) -> dict:
+    fixtures.install(latency_ms=latency_ms)
+    sandbox = Sandbox()
+    try:
+        stages = build_stages(sandbox)
+        results = {}
+        for name, (setup, run) in stages.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(setup, run, iterations)
+            r = results[name]
+            print(f"{name:<32} p50 {r['p50'] * 1000:9.2f} ms  p95 {r['p95'] * 1000:9.2f} ms  "
+                  f"peak {r['peak_kib']:9.0f} KiB", flush=True)
+    finally:
+        sandbox.close()
+        fixtures.uninstall()
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": results,
+    }
+
+
+def record_fixtures():
+    """Run every provider-facing stage once per ticker against the live APIs, recording the responses."""
+    fixtures.install_recorder()
+    sandbox = Sandbox()
+    try:
+        for name, (setup, run) in build_stages(sandbox).items():
+            if name.startswith(("models.", "inference.")):
+                continue
+            for _ in range(1 if name in UNIVERSE_STAGES else len(TICKERS)):
+                run(*setup())
+            print(f"recorded {name}", flush=True)
+    finally:
+        sandbox.close()
+        fixtures.uninstall()
+
+
+# ----------------------- comparison -----------------------
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """Print both runs side by side; returns the stages that regressed."""
+    regressions = []
+    print(f"{'stage':<32} {'base p50':>10} {'head p50':>10} {'change':>8} {'head p95':>10} {'peak':>8}")
+    for name, b in base["stages"].items():
+        h = head["stages"].get(name)
+        if h is None:
+            continue
+        time_change = h["p50"] / b["p50"] - 1 if b["p50"] else 0.0
+        memory_change = h["peak_kib"] / b["peak_kib"] - 1 if b["peak_kib"] else 0.0
+        regressed = time_change > threshold or memory_change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {b['p50'] * 1000:8.2f}ms {h['p50'] * 1000:8.2f}ms {time_change:+8.1%} "
+              f"{h['p95'] * 1000:8.2f}ms {memory_change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def run_commit(ref: str, workdir: str, extra_args: list) -> dict:
+    """Run this suite against `ref` checked out in a temporary worktree."""
+    tree = os.path.join(workdir, ref.replace("/", "_"))
+    out = f"{tree}.json"
+    subprocess.run(["git", "-C", REPO_DIR, "worktree", "add", "--detach", tree, ref], check=True)
+    try:
+        # The suite and fixtures under test are this checkout's, so both refs run the same benchmark
+        shutil.copytree(BENCH_DIR, os.path.join(tree, "benchmarks"), dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns("__pycache__"))
+        for name in list(MODEL_FILES.values()) + ["sp500.csv", "realtime_marco.csv"]:
+            if not os.path.exists(os.path.join(tree, name)):
+                shutil.copy(os.path.join(REPO_DIR, name), tree)
+        print(f"--- {ref}", flush=True)
+        subprocess.run([sys.executable, os.path.join("benchmarks", "run_benchmarks.py"), "--out", out] + extra_args,
+                       cwd=tree, check=True)
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        subprocess.run(["git", "-C", REPO_DIR, "worktree", "remove", "--force", tree], check=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="run only stages starting with these")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files")
+    parser.add_argument("--commits", nargs=2, metavar=("BASE", "HEAD"), help="benchmark and compare two git refs")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p50 / peak memory growth")
+    parser.add_argument("--latency-ms", help='replayed provider latency, "150" or "fmp=120,yahoo=400"')
+    parser.add_argument("--record", action="store_true", help="record fixtures from the live APIs")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            head = json.load(f)
+    elif args.commits:
+        suite_args = ["--iterations", str(args.iterations)] + (["--only"] + args.only if args.only else [])
+        if args.latency_ms:
+            suite_args += ["--latency-ms", args.latency_ms]
+        with tempfile.TemporaryDirectory(prefix="bench-commits-") as workdir:
+            base, head = (run_commit(ref, workdir, suite_args) for ref in args.commits)
+    elif args.record:
+        os.chdir(REPO_DIR)
+        record_fixtures()
+        sys.exit(0)
+    else:
+        os.chdir(REPO_DIR)
+        results = run_suite(args.iterations, args.only, args.latency_ms)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+        sys.exit(0)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"base": base, "head": head}, f, indent=2)
+    sys.exit(1 if compare(base, head, args.threshold) else 0)
@@ -0,0 +1,283 @@
+"""Background cache warming for the sp500.csv universe.
+
+A daemon thread walks the universe every WARM_INTERVAL_SECONDS, most-viewed
+tickers first, and fills the price store, the company profiles and the
+peer index built from them, the key metrics and the local FRED store, so
+that interactive requests are served from cache.
+
+Every HTTP request the warmer sends, including each ticker of a batched
+Yahoo download, takes a token from its provider's WARM_RATE_LIMITS
+bucket. Providers with a daily plan quota (FMP) also draw on a budget
+of WARM_QUOTA_SHARE of PROVIDER_DAILY_QUOTAS, counted per day and saved
+to data/warm_budget.json after every FMP call so restarts keep it, and
+the pass stops calling them once it is spent. Walking FMP (profiles,
+peers, key metrics for the whole universe) is opt-in with
+CACHE_WARM_FMP=1.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from http_client import is_cached, request_gate
+from macro_store import get_macro_store, SERIES_IDS
+from price_store import get_price_store
+from peer_index import get_peer_index
+from providers import PROFILE_BATCH_SIZE, fetch_profiles, fetch_fundamentals
+from ticker_metadata import update_from_profiles
+
+
+WARM_INTERVAL_SECONDS = int(os.environ.get("CACHE_WARM_INTERVAL", 6 * 60 * 60))
+
+# Requests per minute the warmer may send to each provider
+WARM_RATE_LIMITS = {"yahoo": 30, "fmp": 10, "fred": 60}
+
+# Requests per day the provider plan allows (FMP's free plan: 250), and
+# the share of it the warmer may use, leaving the rest to the pages
+PROVIDER_DAILY_QUOTAS = {"fmp": int(os.environ.get("FMP_DAILY_QUOTA", 250))}
+WARM_QUOTA_SHARE = float(os.environ.get("CACHE_WARM_QUOTA_SHARE", 0.5))
+
+# Profiles, peers and key metrics for the whole universe cost FMP quota
+WARM_FMP = os.environ.get("CACHE_WARM_FMP", "0") == "1"
+
+PRICE_BATCH_SIZE = 50
+VIEWS_PATH = os.path.join("data", "ticker_views.json")
+BUDGET_PATH = os.path.join("data", "warm_budget.json")
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` calls with a burst of the same size."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: threading.Event = None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if stop_event is not None and stop_event.wait(wait):
+                return False
+            if stop_event is None:
+                time.sleep(wait)
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class DailyBudget:
+    """Requests spent per provider today, persisted so restarts do not reset it."""
+
+    def __init__(self, limits: dict, path: str = BUDGET_PATH):
+        self.limits = limits
+        self.path = path
+        self._lock = threading.Lock()
+        self.day, self.spent = self._load()
+
+    def _load(self):
+        today = datetime.date.today().isoformat()
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get("day") == today:
+                return today, Counter(saved.get("spent", {}))
+        except (OSError, ValueError):
+            pass
+        return today, Counter()
+
+    def save(self):
+        with self._lock:
+            record = {"day": self.day, "spent": dict(self.spent)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self.path)
+
+    def take(self, provider: str, cost: int = 1) -> bool:
+        with self._lock:
+            today = datetime.date.today().isoformat()
+            if today != self.day:
+                self.day, self.spent = today, Counter()
+            limit = self.limits.get(provider)
+            if limit is not None and self.spent[provider] + cost > limit:
+                return False
+            self.spent[provider] += cost
+            return True
+
+    def exhausted(self, provider: str) -> bool:
+        limit = self.limits.get(provider)
+        with self._lock:
+            return limit is not None and self.spent[provider] >= limit
+
+
+# --- View counts used to prioritise the walk ---
+_views = Counter()
+_views_lock = threading.Lock()
+
+
+def record_view(ticker: str):
+    with _views_lock:
+        _views[ticker.upper()] += 1
+
+
+def _load_views():
+    try:
+        with open(VIEWS_PATH) as f:
+            with _views_lock:
+                _views.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+
+def _save_views():
+    with _views_lock:
+        views = dict(_views)
+    os.makedirs(os.path.dirname(VIEWS_PATH), exist_ok=True)
+    tmp_path = f"{VIEWS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(views, f)
+    os.replace(tmp_path, VIEWS_PATH)
+
+
+def prioritised_universe(path: str = "sp500.csv") -> list:
+    """Universe ordered by view count, most viewed first, ties in file order."""
+    tickers = [t.upper() for t in pd.read_csv(path)["ticker"].dropna().tolist()]
+    with _views_lock:
+        views = dict(_views)
+    order = {t: i for i, t in enumerate(tickers)}
+    return sorted(tickers, key=lambda t: (-views.get(t, 0), order[t]))
+
+
+class CacheWarmer:
+
+    def __init__(self, interval: float = WARM_INTERVAL_SECONDS, rate_limits: dict = None,
+                 daily_quotas: dict = None, warm_fmp: bool = WARM_FMP):
+        self.interval = interval
+        self.limiters = {name: RateLimiter(rpm) for name, rpm in {**WARM_RATE_LIMITS, **(rate_limits or {})}.items()}
+        quotas = {**PROVIDER_DAILY_QUOTAS, **(daily_quotas or {})}
+        self.budget = DailyBudget({name: int(quota * WARM_QUOTA_SHARE) for name, quota in quotas.items()})
+        self.warm_fmp = warm_fmp
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----------------------- one pass -----------------------
+    def _gate(self, provider: str, cost: int = 1):
+        """Runs before every request sent from inside _call()."""
+        if self._stop.is_set():
+            raise InterruptedError("cache warmer stopping")
+        if not self.budget.take(provider, cost):
+            raise QuotaExhausted(provider)
+        limiter = self.limiters.get(provider)
+        for _ in range(cost if limiter is not None else 0):
+            if not limiter.acquire(self._stop):
+                raise InterruptedError("cache warmer stopping")
+
+    def _call(self, fn, *args):
+        with request_gate(self._gate):
+            try:
+                return fn(*args)
+            except Exception:
+                return None
+
+    def run_once(self) -> dict:
+        started = time.time()
+        tickers = prioritised_universe()
+        stats = {"prices": 0, "profiles": 0, "fundamentals": 0, "peers": 0, "macro": 0}
+
+        # Incremental update of the local FRED store read by features and the macro tab
+        macro_store = get_macro_store()
+        for series_id in SERIES_IDS.values():
+            if self._stop.is_set():
+                break
+            if self._call(macro_store.update, series_id) is not None:
+                stats["macro"] += 1
+
+        store = get_price_store()
+        for start in range(0, len(tickers), PRICE_BATCH_SIZE):
+            if self._stop.is_set():
+                break
+            chunk = tickers[start:start + PRICE_BATCH_SIZE]
+            prices = self._call(store.history_many, chunk, "1d", 60, True)
+            stats["prices"] += len(prices or {})
+
+        if self.warm_fmp:
+            self._warm_fmp(tickers, stats)
+        # Peers are computed locally from the stored metadata and saved for the pages
+        stats["peers"] = len(self._call(get_peer_index, True) or ())
+
+        self.budget.save()
+        _save_views()
+        self.last_run = {"started": started, "seconds": time.time() - started, **stats}
+        return self.last_run
+
+    def _warm_fmp(self, tickers: list, stats: dict):
+        # Bulk profiles also prime the per-symbol cache entries. One request
+        # per chunk, stored as it arrives, so a quota stop keeps what was paid for
+        uncached = [t for t in tickers if not is_cached("fmp", f"/profile/{t}")]
+        for start in range(0, len(uncached), PROFILE_BATCH_SIZE):
+            if self._stop.is_set() or self.budget.exhausted("fmp"):
+                break
+            profiles = self._call(fetch_profiles, uncached[start:start + PROFILE_BATCH_SIZE])
+            self.budget.save()
+            if profiles:
+                update_from_profiles(profiles)
+                stats["profiles"] += len(profiles)
+
+        for ticker in tickers:
+            if self._stop.is_set() or self.budget.exhausted("fmp"):
+                break
+            if is_cached("fmp", f"/key-metrics/{ticker}", {"limit": 1}):
+                continue
+            fundamentals = self._call(fetch_fundamentals, ticker)
+            self.budget.save()
+            if fundamentals is not None:
+                stats["fundamentals"] += 1
+
+    # ----------------------- scheduling -----------------------
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            _load_views()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+
+def start_cache_warmer(interval: float = WARM_INTERVAL_SECONDS) -> CacheWarmer:
+    """Start the process-wide warmer once; later calls return the running instance."""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = CacheWarmer(interval)
+        return _warmer.start()
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+
+# --- Feature definitions shared by page1 and the batch jobs ---
+LOOKBACK_DAYS = 30
+
+MACRO_COLS = [
+    "GDP", "CPI", "Unemployment Rate", "Federal Funds Rate",
+    "Personal Consumption Expenditures", "Industrial Production", "Retail Sales",
+    "M2 Money Stock", "VIX", "TED Spread", "sentiment_score"
+]
+
+FIRM_COLS = [
+    "bm", "divyield", "capei", "gpm", "npm", "roa", "roe",
+    "capital_ratio", "de_ratio", "quick_ratio", "inv_turn"
+]
+
+# Corporate-event codes the models were trained with; realtime_marco.csv
+# carries them next to the macro columns and -1 means no event
+EVENT_COLS = ["execid", "distcd"]
+NO_EVENT = -1.0
+
+FEATURE_COLS = [
+    "PRC", "Volatility_5d", "Momentum", "sentiment_score",
+    *MACRO_COLS[:-1], *FIRM_COLS, *EVENT_COLS  # sentiment_score 已加过
+]
+
+# The volume model reads raw Volume where the volatility model has Volatility_5d
+VOLUME_FEATURE_COLS = ["Volume" if col == "Volatility_5d" else col for col in FEATURE_COLS]
+
+# Model name -> columns it reads from the shared feature frame.
+# A new model only needs an entry here.
+MODEL_FEATURE_COLS = {
+    "volatility": FEATURE_COLS,
+    "volume": VOLUME_FEATURE_COLS,
+}
+
+
+def _day_index(dates) -> pd.DatetimeIndex:
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return dates.normalize()
+
+
+def _macro_values(macro, col: str, dates):
+    """Macro column for the given dates.
+
+    macro is either one row broadcast to every day (realtime_marco.csv) or a
+    date-indexed frame from MacroStore.as_of(). Event codes it does not
+    carry are NO_EVENT.
+    """
+    if isinstance(macro, pd.DataFrame):
+        if col in EVENT_COLS and col not in macro.columns:
+            return np.full(len(dates), NO_EVENT)
+        return macro[col].reindex(_day_index(dates)).to_numpy(np.float64)
+    if col in EVENT_COLS and col not in macro:
+        return NO_EVENT
+    return float(macro[col])
+
+
+def build_feature_frame(prices: pd.DataFrame, macro, firm_data: dict) -> pd.DataFrame:
+    """Last LOOKBACK_DAYS bars with every column any model reads."""
+    df = prices.dropna().tail(LOOKBACK_DAYS).copy()
+    df["PRC"] = df["Close"]
+    df["Momentum"] = df["Close"].pct_change(5).fillna(0)
+    df["Volatility_5d"] = df["Close"].pct_change().rolling(5).std().fillna(0)
+
+    for col in MACRO_COLS + EVENT_COLS:
+        df[col] = _macro_values(macro, col, df.index)
+
+    # The FMP profile only carries some of the firm ratios
+    for col in FIRM_COLS:
+        df[col] = firm_data.get(col, 0.0)
+
+    return df
+
+
+@timed("features.assemble")
+def assemble_features(prices: pd.DataFrame, macro, firm_data: dict) -> dict:
+    """Feature matrix for every model in MODEL_FEATURE_COLS, built from one frame."""
+    df = build_feature_frame(prices, macro, firm_data)
+    return {name: df[cols].values for name, cols in MODEL_FEATURE_COLS.items()}
+
+
+# --- Vectorized builder for many tickers at once ---
+def _price_columns(close: np.ndarray, volume: np.ndarray) -> dict:
+    """Price-derived columns for (N, LOOKBACK_DAYS) close/volume arrays.
+
+    Matches build_feature_frame: Momentum is a 5-day pct change and
+    Volatility_5d a 5-day rolling std of daily returns, both computed
+    inside the window and zero where the window is too short.
+    """
+    n, t = close.shape
+    momentum = np.zeros((n, t))
+    momentum[:, 5:] = close[:, 5:] / close[:, :-5] - 1
+
+    returns = np.full((n, t), np.nan)
+    returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    volatility = np.zeros((n, t))
+    windows = np.lib.stride_tricks.sliding_window_view(returns, 5, axis=1)   # (N, t - 4, 5)
+    volatility[:, 4:] = np.nan_to_num(windows.std(axis=2, ddof=1), nan=0.0)
+
+    return {"PRC": close, "Volume": volume, "Momentum": momentum, "Volatility_5d": volatility}
+
+
+@timed("features.tensors")
+def build_feature_tensors(prices: dict, macro, firm_data: dict, models: list = None):
+    """(N, LOOKBACK_DAYS, F) float32 tensors for every model, N tickers at once.
+
+    prices maps ticker -> OHLCV frame, macro is a row or an as-of frame as
+    in build_feature_frame, and firm_data maps ticker -> metrics dict.
+    Tickers without a full lookback window are dropped. Returns
+    (tickers, {model name: tensor}).
+    """
+    models = models or list(MODEL_FEATURE_COLS)
+    windows = {t: df.dropna().tail(LOOKBACK_DAYS) for t, df in prices.items() if df is not None}
+    tickers = [t for t, df in windows.items() if len(df) == LOOKBACK_DAYS]
+    if not tickers:
+        return [], {name: np.empty((0, LOOKBACK_DAYS, len(MODEL_FEATURE_COLS[name])), np.float32) for name in models}
+
+    close = np.stack([windows[t]["Close"].to_numpy(np.float64) for t in tickers])
+    volume = np.stack([windows[t]["Volume"].to_numpy(np.float64) for t in tickers])
+    columns = _price_columns(close, volume)
+
+    # Firm values vary by ticker only; a single macro row is the same for every ticker and day
+    if isinstance(macro, pd.DataFrame):
+        dates = np.concatenate([windows[t].index for t in tickers])
+        for col in MACRO_COLS + EVENT_COLS:
+            columns[col] = _macro_values(macro, col, dates).reshape(len(tickers), LOOKBACK_DAYS)
+    else:
+        for col in MACRO_COLS + EVENT_COLS:
+            columns[col] = _macro_values(macro, col, None)
+    for col in FIRM_COLS:
+        columns[col] = np.array([float(firm_data.get(t, {}).get(col, 0.0) or 0.0) for t in tickers])[:, None]
+
+    return tickers, _stack(columns, len(tickers), models)
+
+
+@timed("features.tensors")
+def build_archive_tensors(archive, end, macro, firm_data: dict, tickers: list = None, models: list = None):
+    """build_feature_tensors for the LOOKBACK_DAYS archive dates up to `end`.
+
+    archive is a history_archive.HistoryArchive; the close and volume
+    windows are sliced from its mapped files instead of per-ticker frames.
+    Tickers missing a bar inside the window are dropped rather than
+    reaching further back as build_feature_tensors does. Returns
+    (tickers, {model name: tensor}).
+    """
+    models = models or list(MODEL_FEATURE_COLS)
+    tickers, dates, values = archive.window(end, LOOKBACK_DAYS, tickers)
+    if not tickers:
+        return [], {name: np.empty((0, LOOKBACK_DAYS, len(MODEL_FEATURE_COLS[name])), np.float32) for name in models}
+
+    columns = _price_columns(values["Close"], values["Volume"])
+    # Every ticker shares the archive's dates, so the macro columns broadcast over tickers
+    for col in MACRO_COLS + EVENT_COLS:
+        columns[col] = _macro_values(macro, col, dates)
+    for col in FIRM_COLS:
+        columns[col] = np.array([float(firm_data.get(t, {}).get(col, 0.0) or 0.0) for t in tickers])[:, None]
+
+    return tickers, _stack(columns, len(tickers), models)
+
+
+def _stack(columns: dict, n: int, models: list) -> dict:
+    """(n, LOOKBACK_DAYS, F) float32 tensor per model from broadcastable columns."""
+    tensors = {}
+    for name in models:
+        cols = MODEL_FEATURE_COLS[name]
+        out = np.empty((n, LOOKBACK_DAYS, len(cols)), dtype=np.float32)
+        for j, col in enumerate(cols):
+            out[:, :, j] = columns[col]
+        tensors[name] = out
+    return tensors
+
+
+@timed("features.history")
+def build_history_tensors(prices: pd.DataFrame, macro, firm_data: dict, models: list = None):
+    """Every complete LOOKBACK_DAYS window of one ticker's history, for walk-forward use.
+
+    Window i ends on dates[i] and holds the same values assemble_features
+    would build from the bars up to that day. The price and macro windows
+    are strided views until they are written into the tensors. Returns
+    (dates, {model name: (D, LOOKBACK_DAYS, F) tensor}).
+    """
+    models = models or list(MODEL_FEATURE_COLS)
+    df = prices.dropna()
+    n = len(df) - LOOKBACK_DAYS + 1
+    if n <= 0:
+        return df.index[:0], {name: np.empty((0, LOOKBACK_DAYS, len(MODEL_FEATURE_COLS[name])), np.float32)
+                              for name in models}
+
+    def windows(values: np.ndarray) -> np.ndarray:
+        return np.lib.stride_tricks.sliding_window_view(values, LOOKBACK_DAYS)    # (D, LOOKBACK_DAYS)
+
+    columns = _price_columns(windows(df["Close"].to_numpy(np.float64)), windows(df["Volume"].to_numpy(np.float64)))
+    for col in MACRO_COLS + EVENT_COLS:
+        values = _macro_values(macro, col, df.index)
+        columns[col] = windows(values) if isinstance(macro, pd.DataFrame) else values
+    for col in FIRM_COLS:
+        columns[col] = float(firm_data.get(col, 0.0) or 0.0)
+
+    return df.index[LOOKBACK_DAYS - 1:], _stack(columns, n, models)
@@ -0,0 +1,214 @@
+"""Memory-mapped columnar OHLCV archive for the whole universe.
+
+    python history_archive.py                # build data/archive/1d from the price store
+    python history_archive.py --interval 1h
+
+Each build writes a new version directory under the interval's directory,
+data/archive/<interval>/<version>/, holding:
+    dates.npy            (T,) datetime64[ns], ascending
+    tickers.json         the N tickers, in row order
+    <Field>.npy          (N, T) float64 per OHLCV field, NaN where a ticker has no bar
+    meta.json            when and from what it was built
+
+open_archive() maps the field files with np.load(mmap_mode="r"), so it
+returns immediately whatever the size, a slice reads only the pages it
+touches, and every process opening the archive shares the same pages
+in the OS cache. A ticker's history is one contiguous row.
+
+data/archive/<interval>/CURRENT names the version readers open. A build
+publishes its version by replacing CURRENT in one os.replace, so there is
+always exactly one complete archive to open, never a half-written one and
+never none. The previous version is kept for processes that read
+CURRENT just before the swap; older ones are removed.
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_store import get_price_store
+
+
+ARCHIVE_DIR = os.path.join("data", "archive")
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _archive_path(root: str, interval: str) -> str:
+    return os.path.join(root, interval)
+
+
+def _current_version(root: str, interval: str):
+    """Directory of the published version, or None if the interval has none."""
+    base = _archive_path(root, interval)
+    try:
+        with open(os.path.join(base, "CURRENT")) as f:
+            path = os.path.join(base, f.read().strip())
+    except OSError:
+        return None
+    return path if os.path.exists(os.path.join(path, "meta.json")) else None
+
+
+def _publish(base: str, version: str):
+    """Point CURRENT at `version`, keep it and the version it replaced, and drop the older ones."""
+    previous = _current_version(os.path.dirname(base), os.path.basename(base))
+    tmp_path = os.path.join(base, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(base, "CURRENT"))
+    # Version names sort by build time; newer ones may belong to a concurrent build
+    oldest = min(version, os.path.basename(previous)) if previous else version
+    for name in os.listdir(base):
+        path = os.path.join(base, name)
+        if name == "CURRENT" or name.endswith(".tmp"):
+            continue
+        if os.path.isdir(path):
+            if name < oldest:
+                shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)    # files of the single-directory layout
+
+
+def build_archive(tickers: list, interval: str = "1d", root: str = ARCHIVE_DIR, store=None) -> str:
+    """Write every stored bar of `tickers` into a new archive version and publish it; returns its directory."""
+    store = store or get_price_store()
+    frames = {}
+    for ticker in tickers:
+        df = store.stored(ticker, interval)
+        if df is None or df.empty:
+            continue
+        if df.index.tz is not None:
+            df = df.tz_localize(None)
+        frames[ticker.upper()] = df[~df.index.duplicated(keep="last")]
+
+    dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values())))) if frames \
+        else pd.DatetimeIndex([])
+    names = sorted(frames)
+
+    base = _archive_path(root, interval)
+    # Fixed-width fields, so names sort by build time as strings
+    version = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid():07d}"
+    tmp = os.path.join(base, f"{version}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "dates.npy"), dates.values.astype("datetime64[ns]"))
+    with open(os.path.join(tmp, "tickers.json"), "w") as f:
+        json.dump(names, f)
+    for field in FIELDS:
+        # Filled row by row through a memmap, so the build never holds a second copy
+        out = np.lib.format.open_memmap(os.path.join(tmp, f"{field}.npy"), mode="w+",
+                                        dtype=np.float64, shape=(len(names), len(dates)))
+        for i, ticker in enumerate(names):
+            out[i] = frames[ticker][field].reindex(dates).to_numpy(np.float64)
+        out.flush()
+        del out
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"built_at": datetime.datetime.now().isoformat(timespec="seconds"), "interval": interval,
+                   "tickers": len(names), "dates": len(dates), "fields": list(FIELDS)}, f)
+
+    final = os.path.join(base, version)
+    os.replace(tmp, final)
+    _publish(base, version)
+    return final
+
+
+class HistoryArchive:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")))
+        with open(os.path.join(path, "tickers.json")) as f:
+            self.tickers = json.load(f)
+        self._rows = {t: i for i, t in enumerate(self.tickers)}
+        self._fields = {field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r") for field in FIELDS}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker.upper() in self._rows
+
+    def row(self, ticker: str) -> int:
+        return self._rows[ticker.upper()]
+
+    def field(self, name: str) -> np.ndarray:
+        """The (N, T) read-only memmap of one field."""
+        return self._fields[name]
+
+    def date_slice(self, start=None, end=None) -> slice:
+        """Columns with start <= date <= end."""
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return slice(lo, hi)
+
+    def series(self, ticker: str, field: str, start=None, end=None) -> np.ndarray:
+        """One ticker's values as a view of the mapped file."""
+        return self._fields[field][self.row(ticker), self.date_slice(start, end)]
+
+    def frame(self, ticker: str, start=None, end=None) -> pd.DataFrame:
+        """OHLCV frame like PriceStore.history() returns, without the days the ticker has no bar."""
+        cols = self.date_slice(start, end)
+        i = self.row(ticker)
+        df = pd.DataFrame({field: self._fields[field][i, cols] for field in FIELDS}, index=self.dates[cols])
+        return df.dropna(how="all")
+
+    def window(self, end, days: int, tickers: list = None) -> tuple:
+        """The last `days` dates up to `end` for many tickers: (tickers, dates, {field: (n, days) array}).
+
+        Rows are views when `tickers` is None (all of them); tickers with a
+        missing bar inside the window are left out.
+        """
+        hi = self.date_slice(end=end).stop
+        cols = slice(max(0, hi - days), hi)
+        rows = slice(None) if tickers is None else [self.row(t) for t in tickers if t in self]
+        names = self.tickers if tickers is None else [self.tickers[i] for i in rows]
+        values = {field: self._fields[field][rows, cols] for field in FIELDS}
+        complete = ~np.isnan(values["Close"]).any(axis=1) & ~np.isnan(values["Volume"]).any(axis=1)
+        if hi - cols.start < days:
+            complete[:] = False
+        if not complete.all():
+            names = [t for t, ok in zip(names, complete) if ok]
+            values = {field: v[complete] for field, v in values.items()}
+        return names, self.dates[cols], values
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(interval: str = "1d", root: str = ARCHIVE_DIR, reload: bool = False, required: bool = False):
+    """Per-process HistoryArchive of the published version, or None if it has not been built.
+
+    With required, a missing archive raises FileNotFoundError instead.
+    """
+    key = _archive_path(root, interval)
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None or reload:
+            path = _current_version(root, interval)
+            if path is None:
+                if required:
+                    raise FileNotFoundError(f"No {interval} history archive under {root}; "
+                                            f"build it with python history_archive.py")
+                return None
+            archive = _archives[key] = HistoryArchive(path)
+    return archive
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--no-refresh", action="store_true", help="archive the price store as it is")
+    args = parser.parse_args()
+
+    from replay import install_from_env
+    install_from_env()
+    tickers = pd.read_csv("sp500.csv")["ticker"].dropna().tolist()
+    if not args.no_refresh:
+        get_price_store().history_many(tickers, interval=args.interval, days=1, backfill=True)
+    path = build_archive(tickers, args.interval, args.root)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    print(f"Wrote {path}: {meta['tickers']} tickers x {meta['dates']} dates")
@@ -0,0 +1,261 @@
+"""Shared HTTP client for the data providers.
+
+Every FMP, Finnhub, FRED and Alpha Vantage request goes through get_json().
+Each provider gets one keep-alive session with its own connection pool,
+connect/read timeouts and a bounded retry policy with backoff, so a hung
+provider can no longer block the Streamlit script thread indefinitely.
+Responses are kept in the shared response_cache for as long as the
+provider's cache_ttls allow. Error and rate-limit bodies sent with a 200
+status raise ProviderError instead, so they are never cached.
+"""
+import contextlib
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import span
+from response_cache import response_cache
+
+
+DAY = 24 * 60 * 60
+
+# --- Per-provider settings ---
+# API keys are read from the environment or st.secrets under `secret`,
+# falling back to `default_key`. `cache_ttls` maps an endpoint prefix to
+# how many seconds its responses are cached; other endpoints are not cached.
+PROVIDERS = {
+    "fmp": {
+        "base_url": "https://financialmodelingprep.com/api/v3",
+        "key_param": "apikey",
+        "secret": "FMP_API_KEY",
+        "default_key": "",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "retries": 2,
+        "backoff": 0.5,
+        "pool_size": 16,
+        "cache_ttls": {
+            "/profile/": DAY,
+            "/key-metrics/": 90 * DAY,   # quarterly filings
+        },
+    },
+    "finnhub": {
+        "base_url": "https://finnhub.io/api/v1",
+        "key_param": "token",
+        "secret": "FINNHUB_API_KEY",
+        "default_key": "cvt5it1r01qhup0ude90cvt5it1r01qhup0ude9g",
+        "connect_timeout": 3.05,
+        "read_timeout": 6,
+        "retries": 2,
+        "backoff": 0.5,
+        "pool_size": 8,
+        "cache_ttls": {"/company-news": 5 * 60},
+    },
+    "fred": {
+        "base_url": "https://api.stlouisfed.org/fred",
+        "key_param": "api_key",
+        "secret": "FRED_API_KEY",
+        "default_key": "8e5a7198d8f2aa4127b994c6817400d5",
+        "default_params": {"file_type": "json"},
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "retries": 3,
+        "backoff": 0.5,
+        "pool_size": 8,
+        "cache_ttls": {"/series/observations": DAY},
+    },
+    "alphavantage": {
+        "base_url": "https://www.alphavantage.co",
+        "key_param": "apikey",
+        "secret": "ALPHA_VANTAGE_API_KEY",
+        "default_key": "Y16JFTL2T7VKTAEA",
+        "connect_timeout": 3.05,
+        "read_timeout": 10,
+        "retries": 1,
+        "backoff": 1.0,
+        "pool_size": 4,
+        "cache_ttls": {"/query": DAY},
+    },
+}
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Keys of a 200 OK body that is an error or rate-limit notice rather than data
+ERROR_KEYS = {
+    "fmp": ("Error Message",),
+    "finnhub": ("error",),
+    "fred": ("error_message",),
+    "alphavantage": ("Information", "Note", "Error Message"),
+}
+
+
+class ProviderError(requests.exceptions.RequestException):
+    """The provider answered 200 OK with an error or throttling message instead of data."""
+
+_sessions = {}
+_api_keys = {}
+_lock = threading.Lock()
+
+# Optional stand-in for the network: transport(provider, path, params) -> JSON.
+# Used to run the app and benchmarks against recorded fixtures.
+_transport = None
+
+
+def set_transport(transport):
+    global _transport
+    _transport = transport
+
+
+# Per-thread hook run before every network request, see request_gate()
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def request_gate(gate):
+    """Within the block, gate(provider, cost) runs before each request this thread sends.
+
+    cost is the number of HTTP requests about to be made. The gate may
+    block to pace them, or raise to stop them; cache hits do not reach it.
+    """
+    previous = getattr(_local, "gate", None)
+    _local.gate = gate
+    try:
+        yield
+    finally:
+        _local.gate = previous
+
+
+def gate_request(provider: str, cost: int = 1):
+    gate = getattr(_local, "gate", None)
+    if gate is not None:
+        gate(provider, cost)
+
+
+def configure(provider: str, **settings):
+    """Override settings for one provider, e.g. configure("fmp", api_key="...")."""
+    with _lock:
+        if "api_key" in settings:
+            _api_keys[provider] = settings.pop("api_key")
+        PROVIDERS[provider].update(settings)
+        # Rebuild the session so new pool/retry settings take effect
+        session = _sessions.pop(provider, None)
+    if session is not None:
+        session.close()
+
+
+def _secret(name: str):
+    if os.environ.get(name):
+        return os.environ[name]
+    try:
+        import streamlit as st
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+
+def api_key(provider: str) -> str:
+    with _lock:
+        if provider not in _api_keys:
+            config = PROVIDERS[provider]
+            _api_keys[provider] = _secret(config["secret"]) or config["default_key"]
+        return _api_keys[provider]
+
+
+def get_session(provider: str) -> requests.Session:
+    with _lock:
+        if provider not in _sessions:
+            config = PROVIDERS[provider]
+            retry = Retry(
+                total=config["retries"],
+                backoff_factor=config["backoff"],
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["pool_size"], max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+        return _sessions[provider]
+
+
+def cache_ttl(provider: str, path: str):
+    """Seconds to cache a response from this endpoint, or None."""
+    ttls = PROVIDERS[provider].get("cache_ttls", {})
+    matches = [prefix for prefix in ttls if path.startswith(prefix)]
+    return ttls[max(matches, key=len)] if matches else None
+
+
+def _cache_key(provider: str, path: str, params: dict = None) -> tuple:
+    query = {**PROVIDERS[provider].get("default_params", {}), **(params or {})}
+    return response_cache.make_key(provider, path, query)
+
+
+def is_cached(provider: str, path: str, params: dict = None) -> bool:
+    return response_cache.contains(_cache_key(provider, path, params))
+
+
+def prime_cache(provider: str, path: str, data, params: dict = None):
+    """Store data as the cached response for an endpoint, e.g. one slice of a bulk call."""
+    ttl = cache_ttl(provider, path)
+    if ttl is not None:
+        response_cache.set(_cache_key(provider, path, params), data, ttl)
+
+
+def _endpoint(path: str) -> str:
+    # "/profile/AAPL" -> "/profile", so metrics have one series per endpoint
+    return "/" + path.lstrip("/").split("/")[0]
+
+
+def fetch_live(provider: str, path: str, query: dict):
+    """One uncached request to the provider itself; query excludes the API key."""
+    config = PROVIDERS[provider]
+    response = get_session(provider).get(
+        config["base_url"] + path,
+        params={**query, config["key_param"]: api_key(provider)},
+        timeout=(config["connect_timeout"], config["read_timeout"]),
+    )
+    response.raise_for_status()
+    return check_payload(provider, path, response.json())
+
+
+def check_payload(provider: str, path: str, data):
+    """data, unless it is one of the provider's error bodies, which raise ProviderError.
+
+    Runs before anything is cached or recorded, so one throttled call is
+    not served back for the endpoint's whole cache TTL.
+    """
+    if isinstance(data, dict):
+        for key in ERROR_KEYS.get(provider, ()):
+            if key in data:
+                raise ProviderError(f"{provider} {path}: {data[key]}")
+    return data
+
+
+def get_json(provider: str, path: str, params: dict = None, use_cache: bool = True):
+    """GET base_url + path for a provider and return the decoded JSON body."""
+    config = PROVIDERS[provider]
+    query = {**config.get("default_params", {}), **(params or {})}
+
+    # The API key is left out of the cache key
+    ttl = cache_ttl(provider, path) if use_cache else None
+    cache_key = _cache_key(provider, path, params)
+    if ttl is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    gate_request(provider)
+    with span("provider.request", provider=provider, endpoint=_endpoint(path)):
+        if _transport is not None:
+            data = _transport(provider, path, query)
+        else:
+            data = fetch_live(provider, path, query)
+    if ttl is not None:
+        response_cache.set(cache_key, data, ttl)
+    return data
@@ -0,0 +1,136 @@
+"""Stateful LSTM inference that advances one bar at a time.
+
+StatefulPredictor caches each ticker's LSTM (h, c) state. When the next
+window is the previous one shifted by a single new bar, only that bar
+runs through the LSTM: one timestep instead of LOOKBACK_DAYS. The full
+window is recomputed from scratch when the ticker is new, when more
+than one bar arrived, when the model version or window definition
+changed, or after REPRIME_AFTER incremental steps.
+
+An advanced state has seen every bar since the last full recompute, not
+just the last LOOKBACK_DAYS, so it drifts slowly from the sliding-window
+result. REPRIME_AFTER caps how far it can drift;
+benchmarks/bench_incremental.py reports that drift against a full
+recompute for each step count up to it.
+
+Cached states are never modified. An update builds new ones and only
+stores them if no concurrent update replaced the state it started from,
+so two calls for the same ticker cannot both advance one state.
+"""
+import threading
+
+import numpy as np
+import torch
+
+from features import LOOKBACK_DAYS, MODEL_FEATURE_COLS
+
+
+REPRIME_AFTER = LOOKBACK_DAYS
+
+
+class _TickerState:
+    __slots__ = ("key", "h", "c", "last_row", "steps", "prediction")
+
+    def __init__(self, key, h, c, last_row, prediction, steps: int = 0):
+        self.key = key
+        self.h = h
+        self.c = c
+        self.last_row = last_row
+        self.steps = steps
+        self.prediction = prediction
+
+
+class StatefulPredictor:
+
+    def __init__(self, registry, name: str, reprime_after: int = REPRIME_AFTER):
+        self.registry = registry
+        self.name = name
+        self.reprime_after = reprime_after
+        self.full_updates = 0
+        self.incremental_updates = 0
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _key(self, window: int) -> tuple:
+        # Any change here forces a full recompute
+        return self.registry.version(self.name), window, tuple(MODEL_FEATURE_COLS.get(self.name, ()))
+
+    def _model(self):
+        model = self.registry.get(self.name)
+        if not hasattr(model, "forward_with_state"):
+            raise TypeError(f"Stateful inference needs an eager model, '{self.name}' is {type(model).__name__}")
+        return model
+
+    def _can_advance(self, state, key, X: np.ndarray) -> bool:
+        return (
+            state is not None
+            and state.key == key
+            and state.steps < self.reprime_after
+            and np.array_equal(X[-2], state.last_row)
+        )
+
+    def update_many(self, tickers: list, X: np.ndarray) -> np.ndarray:
+        """Predictions for each ticker's latest (window, features) slice of X.
+
+        Tickers whose window moved by exactly one bar are advanced together
+        in one single-step batch; the rest are recomputed in one full batch.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        key = self._key(X.shape[1])
+        model = self._model()
+        predictions = np.empty(len(tickers), dtype=np.float32)
+
+        with self._lock:
+            states = [self._states.get(t) for t in tickers]
+        step, full = [], []
+        for i, state in enumerate(states):
+            if state is not None and state.key == key and np.array_equal(X[i, -1], state.last_row):
+                predictions[i] = state.prediction    # no new bar since the last call
+            elif self._can_advance(state, key, X[i]):
+                step.append(i)
+            else:
+                full.append(i)
+
+        updated = {}
+        with torch.inference_mode():
+            if step:
+                h = torch.cat([states[i].h for i in step], dim=1)
+                c = torch.cat([states[i].c for i in step], dim=1)
+                out, (h, c) = model.forward_with_state(torch.from_numpy(X[step, -1:]), (h, c))
+                for j, i in enumerate(step):
+                    updated[i] = _TickerState(key, h[:, j:j + 1].clone(), c[:, j:j + 1].clone(),
+                                              X[i, -1].copy(), float(out[j, 0]), states[i].steps + 1)
+
+            if full:
+                out, (h, c) = model.forward_with_state(torch.from_numpy(X[full]))
+                for j, i in enumerate(full):
+                    updated[i] = _TickerState(key, h[:, j:j + 1].clone(), c[:, j:j + 1].clone(),
+                                              X[i, -1].copy(), float(out[j, 0]))
+        for i, state in updated.items():
+            predictions[i] = state.prediction
+
+        with self._lock:
+            for i, state in updated.items():
+                # Only replace the state this update started from; a concurrent
+                # update that got there first keeps its result
+                if self._states.get(tickers[i]) is states[i]:
+                    self._states[tickers[i]] = state
+            self.incremental_updates += len(step)
+            self.full_updates += len(full)
+        return predictions
+
+    def update(self, ticker: str, X: np.ndarray) -> float:
+        return float(self.update_many([ticker], np.asarray(X)[None])[0])
+
+    def steps_since_full(self, ticker: str) -> int:
+        """Incremental steps the ticker's cached state has taken since its last full recompute."""
+        with self._lock:
+            state = self._states.get(ticker)
+        return None if state is None else state.steps
+
+    def invalidate(self, ticker: str = None):
+        with self._lock:
+            if ticker is None:
+                self._states.clear()
+            else:
+                self._states.pop(ticker, None)
@@ -0,0 +1,167 @@
+"""CPU inference variants of LSTMVolumePredictor.
+
+    python inference_optim.py --threads 4 --out models/
+
+Our serving hosts have no GPU, so this provides:
+- dynamic int8 quantization of the LSTM and Linear layers
+- a TorchScript trace of either the float or the quantized model
+- control over intra-op threads
+- a parity check that a variant stays within PARITY_RTOL of the float model,
+  on feature windows built the way the app builds them (see parity_batch)
+
+The CLI writes a traced file for each variant and prints parity and
+per-batch latency.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+
+
+DEFAULT_TIME_STEPS = 30
+
+# A variant passes parity if, on the check batch, its largest deviation from
+# the float model is at most this fraction of the largest float output.
+PARITY_RTOL = 0.02
+
+VARIANTS = ("float", "int8", "traced", "int8-traced")
+
+
+def set_inference_threads(intra_op: int = None, inter_op: int = None):
+    """Pin torch's thread pools; inter-op can only be set before any parallel work."""
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            pass
+
+
+def quantize(model: nn.Module) -> nn.Module:
+    return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def trace(model: nn.Module, input_size: int, time_steps: int = DEFAULT_TIME_STEPS) -> torch.jit.ScriptModule:
+    example = torch.zeros(1, time_steps, input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example, check_trace=False).eval()
+    try:
+        return torch.jit.freeze(traced)
+    except Exception:
+        # Some quantized ops cannot be frozen; the plain trace still avoids Python dispatch
+        return traced
+
+
+def build_variant(model: nn.Module, variant: str) -> nn.Module:
+    input_size = model.lstm.input_size
+    if variant == "float":
+        return model
+    if variant == "int8":
+        return quantize(model)
+    if variant == "traced":
+        return trace(model, input_size)
+    if variant == "int8-traced":
+        return trace(quantize(model), input_size)
+    raise ValueError(f"Unknown variant: {variant}")
+
+
+def sample_batch(input_size: int, batch: int = 64, time_steps: int = DEFAULT_TIME_STEPS, seed: int = 0):
+    generator = torch.Generator().manual_seed(seed)
+    return torch.randn(batch, time_steps, input_size, generator=generator)
+
+
+def _synthetic_prices(days: int, rng) -> pd.DataFrame:
+    index = pd.bdate_range(end="2025-04-30", periods=days)
+    close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(1_000_000, 50_000_000, days).astype(float)}, index=index)
+
+
+def parity_batch(name: str, input_size: int, batch: int = 64, seed: int = 0) -> torch.Tensor:
+    """Up to `batch` feature windows for model `name`, at the scale the model sees in production.
+
+    Inputs are unnormalized (GDP around 3e4, Volume around 1e7), so a unit
+    normal batch says little about quantization error. Windows come from
+    the tickers already in the price store, topped up with seeded random
+    walks, with today's realtime_marco.csv row. Falls back to sample_batch()
+    for a model features.py does not describe.
+    """
+    from features import LOOKBACK_DAYS, MODEL_FEATURE_COLS, build_feature_tensors
+    from price_store import get_price_store
+
+    if len(MODEL_FEATURE_COLS.get(name, ())) != input_size:
+        return sample_batch(input_size, batch, seed=seed)
+    prices = {}
+    try:
+        store = get_price_store()
+        for ticker in pd.read_csv("sp500.csv")["ticker"].dropna().tolist():
+            stored = store.stored(ticker)
+            if stored is not None:
+                prices[ticker] = stored
+            if len(prices) == batch:
+                break
+    except OSError:
+        pass
+    rng = np.random.default_rng(seed)
+    for i in range(batch - len(prices)):
+        prices[f"_synthetic{i}"] = _synthetic_prices(2 * LOOKBACK_DAYS, rng)
+    macro = pd.read_csv("realtime_marco.csv").iloc[-1]
+    _, tensors = build_feature_tensors(prices, macro, {}, [name])
+    return torch.from_numpy(tensors[name][:batch])
+
+
+def check_parity(reference: nn.Module, candidate: nn.Module, X: torch.Tensor, rtol: float = PARITY_RTOL) -> dict:
+    with torch.inference_mode():
+        expected = reference(X)
+        actual = candidate(X)
+    max_abs_error = float((actual - expected).abs().max())
+    scale = float(expected.abs().max()) or 1.0
+    return {
+        "max_abs_error": max_abs_error,
+        "relative_error": max_abs_error / scale,
+        "ok": max_abs_error <= rtol * scale,
+    }
+
+
+def time_batch(model: nn.Module, X: torch.Tensor, repeat: int = 20) -> float:
+    """Best-of-`repeat` seconds for one forward pass over X."""
+    with torch.inference_mode():
+        model(X)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(X)
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads")
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--out", default="models")
+    args = parser.parse_args()
+
+    from model_registry import MODEL_FILES, load_model
+
+    set_inference_threads(args.threads)
+    os.makedirs(args.out, exist_ok=True)
+
+    for name, path in MODEL_FILES.items():
+        model = load_model(path)
+        X = parity_batch(name, model.lstm.input_size, args.batch)
+        baseline = time_batch(model, X)
+        print(f"{name}: float {baseline * 1000:.2f} ms/batch of {args.batch}")
+        for variant in VARIANTS[1:]:
+            optimized = build_variant(model, variant)
+            parity = check_parity(model, optimized, X)
+            seconds = time_batch(optimized, X)
+            print(f"  {variant:<12} {seconds * 1000:8.2f} ms  x{baseline / seconds:4.1f}  "
+                  f"rel err {parity['relative_error']:.4f} {'ok' if parity['ok'] else 'FAIL'}")
+            if variant.endswith("traced"):
+                torch.jit.save(optimized, os.path.join(args.out, f"{name}_{variant}.pt"))
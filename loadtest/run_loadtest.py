@@ -0,0 +1,245 @@
+"""Concurrent-session load test of the Streamlit pages.
+
+    python loadtest/run_loadtest.py --sessions 1 2 4 8 16 32 --flows 3 --latency-ms "fmp=120,yahoo=300,*=80"
+
+Every simulated session is a streamlit.testing AppTest walking the same
+flow a user does:
+
+    page0 -> page1 (Predict a ticker) -> page2 (Select a ticker) -> page4
+
+Sessions run as threads of this one process, as they would inside one
+`streamlit run` server: they share st.cache_resource / st.cache_data, the
+model registry, the response cache and the price store, and compete for
+the same GIL. Provider calls are replayed from benchmarks/fixtures
+through replay.py (synthesized where nothing was recorded), with the
+given latency and error rate, and all local stores live in a temporary
+directory.
+
+Every level starts from empty stores, Streamlit caches and model
+registry, as after a restart, with only the peer index built
+beforehand, as the cache warmer or peer_index.py would have.
+
+For each session count the harness reports completed flows per second,
+p50/p95/p99 of every step and of the whole flow, failed steps, and
+resident memory per session. The text of every failure (script
+exceptions, st.error messages, aborted flows) is kept per step with its
+count, and the most common ones are printed. The JSON output also has
+the metrics.py stage histograms of each level, to show which stage
+saturates. Scaling efficiency is throughput relative to N times the
+single-session throughput; the knee is the last session count before
+efficiency drops below --knee-efficiency or p95 flow time more than
+doubles.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import streamlit as st
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import fixtures  # noqa: E402
+import metrics  # noqa: E402
+import model_registry  # noqa: E402
+import peer_index  # noqa: E402
+from run_benchmarks import Sandbox  # noqa: E402
+
+
+STEPS = ("page0", "page1.load", "page1.predict", "page2.load", "page2.select", "page4")
+TICKERS = ["AAPL", "MSFT", "JPM", "XOM", "JNJ", "NVDA", "PG", "KO"]
+
+# AppTest's own timeout per script run, in seconds
+RUN_TIMEOUT = 120
+
+
+def _rss_kib() -> float:
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _page(name: str) -> AppTest:
+    # AppTest resolves relative paths against the calling file, i.e. loadtest/
+    return AppTest.from_file(os.path.join(REPO_DIR, name), default_timeout=RUN_TIMEOUT)
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _timed(timings: dict, errors: dict, step: str, fn):
+    start = time.perf_counter()
+    at = fn()
+    timings[step].append(time.perf_counter() - start)
+    for element in at.exception:
+        errors[step][element.message] += 1
+    for element in at.error:
+        errors[step][f"st.error: {element.value}"] += 1
+    return at
+
+
+def run_flow(ticker: str, timings: dict, errors: dict):
+    """One user going through page0 -> page1 Predict -> page2 Select -> page4."""
+    _timed(timings, errors, "page0", _page("page0.py").run)
+
+    page1 = _page("page1.py")
+    page1.session_state["gif_displayed"] = True    # skip the two-second opening animation
+    page1 = _timed(timings, errors, "page1.load", page1.run)
+    page1.selectbox[0].set_value(ticker)
+    _timed(timings, errors, "page1.predict", lambda: _button(page1, "Predict").click().run())
+
+    page2 = _timed(timings, errors, "page2.load", _page("page2.py").run)
+    page2.selectbox[0].set_value(ticker)
+    _timed(timings, errors, "page2.select", lambda: _button(page2, "Select").click().run())
+
+    _timed(timings, errors, "page4", _page("page4.py").run)
+
+
+def run_level(sessions: int, flows: int) -> dict:
+    """`sessions` concurrent sessions, each running `flows` flows back to back."""
+    timings = {step: [] for step in STEPS + ("flow",)}
+    # step -> Counter of failure messages; "flow": flows aborted by an exception
+    errors = {step: Counter() for step in STEPS + ("flow",)}
+    lock = threading.Lock()
+
+    def session(index):
+        local_timings = {step: [] for step in timings}
+        local_errors = {step: Counter() for step in errors}
+        for i in range(flows):
+            start = time.perf_counter()
+            try:
+                run_flow(TICKERS[(index + i) % len(TICKERS)], local_timings, local_errors)
+            except Exception as e:
+                local_errors["flow"][f"{type(e).__name__}: {e}"] += 1
+                continue
+            local_timings["flow"].append(time.perf_counter() - start)
+        with lock:
+            for step, values in local_timings.items():
+                timings[step].extend(values)
+            for step, messages in local_errors.items():
+                errors[step].update(messages)
+
+    rss_before = _rss_kib()
+    threads = [threading.Thread(target=session, args=(i,), name=f"session-{i}") for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    rss_after = _rss_kib()
+
+    def percentiles(values):
+        if not values:
+            return {"p50": None, "p95": None, "p99": None}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+    return {
+        "sessions": sessions,
+        "completed_flows": len(timings["flow"]),
+        "wall_seconds": wall,
+        "flows_per_second": len(timings["flow"]) / wall,
+        "steps": {step: percentiles(values) for step, values in timings.items()},
+        "errors": {step: sum(messages.values()) for step, messages in errors.items()},
+        "error_messages": {step: dict(messages.most_common()) for step, messages in errors.items() if messages},
+        "rss_kib": rss_after,
+        "rss_growth_per_session_kib": max(0.0, rss_after - rss_before) / sessions,
+    }
+
+
+def find_knee(levels: list, min_efficiency: float) -> dict:
+    """Adds scaling efficiency to every level and returns the knee level."""
+    base = levels[0]["flows_per_second"] / levels[0]["sessions"]
+    knee = levels[0]
+    previous_p95 = levels[0]["steps"]["flow"]["p95"]
+    for level in levels:
+        level["efficiency"] = level["flows_per_second"] / (base * level["sessions"]) if base else 0.0
+    for level in levels[1:]:
+        p95 = level["steps"]["flow"]["p95"]
+        if level["efficiency"] < min_efficiency or (previous_p95 and p95 and p95 > 2 * previous_p95):
+            break
+        knee, previous_p95 = level, p95
+    return knee
+
+
+def print_report(levels: list, knee: dict):
+    print()
+    print(f"{'sessions':>8} {'flows/s':>8} {'eff':>5} {'flow p50':>9} {'flow p95':>9} {'flow p99':>9} "
+          f"{'predict p95':>12} {'errors':>6} {'RSS MiB':>8} {'KiB/sess':>9}")
+    best = max(level["flows_per_second"] for level in levels) or 1.0
+    for level in levels:
+        flow, predict = level["steps"]["flow"], level["steps"]["page1.predict"]
+        bar = "#" * int(30 * level["flows_per_second"] / best)
+        print(f"{level['sessions']:>8} {level['flows_per_second']:>8.2f} {level['efficiency']:>5.0%} "
+              f"{flow['p50'] or 0:>8.2f}s {flow['p95'] or 0:>8.2f}s {flow['p99'] or 0:>8.2f}s "
+              f"{predict['p95'] or 0:>11.2f}s {sum(level['errors'].values()):>6} "
+              f"{level['rss_kib'] / 1024:>8.0f} {level['rss_growth_per_session_kib']:>9.0f}  {bar}"
+              f"{'  <- knee' if level is knee else ''}")
+    failures = Counter()
+    for level in levels:
+        for step, messages in level["error_messages"].items():
+            failures.update({(step, message): count for message, count in messages.items()})
+    if failures:
+        print("\nMost common failures:")
+        for (step, message), count in failures.most_common(10):
+            print(f"  {count:>5}  {step:<14} {message.splitlines()[0][:120]}")
+    print(f"\nScaling knee: {knee['sessions']} concurrent sessions "
+          f"({knee['flows_per_second']:.2f} flows/s, p95 flow {knee['steps']['flow']['p95'] or 0:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--flows", type=int, default=3, help="flows per session at each level")
+    parser.add_argument("--latency-ms", default="fmp=120,finnhub=150,fred=100,alphavantage=200,yahoo=300",
+                        help='replayed provider latency, "150" or "fmp=120,yahoo=400"')
+    parser.add_argument("--error-rate", default="0", help="replayed provider error rate, same format")
+    parser.add_argument("--knee-efficiency", type=float, default=0.6)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    os.chdir(REPO_DIR)
+    fixtures.install(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    sandbox = Sandbox()
+    levels = []
+    try:
+        for sessions in sorted(args.sessions):
+            # Every level starts from empty stores and caches, as after a restart
+            sandbox.reset()
+            peer_index.build_peer_index(fetch=True).save()    # built offline, as by the warmer
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            model_registry._registry = None    # process-wide, not cleared with cache_resource
+            metrics.registry.reset()
+            levels.append(run_level(sessions, args.flows))
+            level = levels[-1]
+            level["stages"] = {
+                " ".join([stage] + [f"{k}={v}" for k, v in labels.items()]): summary
+                for stage, labels, summary in metrics.registry.series()
+            }
+            print(f"{sessions:>3} sessions: {level['flows_per_second']:.2f} flows/s, "
+                  f"p95 flow {level['steps']['flow']['p95'] or 0:.2f}s", flush=True)
+    finally:
+        sandbox.close()
+        fixtures.uninstall()
+
+    knee = find_knee(levels, args.knee_efficiency)
+    print_report(levels, knee)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "knee_sessions": knee["sessions"], "levels": levels}, f, indent=2)
@@ -0,0 +1,161 @@
+"""Local time-indexed store of the FRED series the models read.
+
+    python macro_store.py          # fetch new observations for every series
+
+Each series lives in data/macro/<SERIES_ID>.csv with the observation date,
+the value, and the date the value became public. Updates only ask FRED
+for observations since the last stored one. Readers never touch the
+network: as_of() gives each requested day the latest value that had been
+released by then, so lookback windows and backtests see what was known
+at the time instead of today's value broadcast to every day.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from http_client import get_json
+
+
+STORE_DIR = os.path.join("data", "macro")
+
+# Model feature column -> FRED series id
+SERIES_IDS = {
+    "GDP": "GDP",
+    "CPI": "CPIAUCSL",
+    "Unemployment Rate": "UNRATE",
+    "Federal Funds Rate": "FEDFUNDS",
+    "Personal Consumption Expenditures": "PCE",
+    "Industrial Production": "INDPRO",
+    "Retail Sales": "RSAFS",
+    "M2 Money Stock": "M2SL",
+    "VIX": "VIXCLS",
+    "TED Spread": "TEDRATE",
+}
+
+# Columns with no FRED series, taken from the fallback row as they are
+FALLBACK_ONLY_COLS = ("sentiment_score", "execid", "distcd")
+
+# Days between a FRED observation date and its first release. FRED dates
+# monthly and quarterly values at the start of the period, so these
+# approximate the usual release calendar for each series.
+PUBLICATION_LAG_DAYS = {
+    "GDP": 120,
+    "CPIAUCSL": 45,
+    "UNRATE": 35,
+    "FEDFUNDS": 32,
+    "PCE": 60,
+    "INDPRO": 46,
+    "RSAFS": 45,
+    "M2SL": 55,
+    "VIXCLS": 1,
+    "TEDRATE": 1,
+}
+
+# Observations to re-request before the last stored one, to pick up revisions
+REVISION_OVERLAP = 3
+
+
+class MacroStore:
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _path(self, series_id: str) -> str:
+        return os.path.join(self.root, f"{series_id}.csv")
+
+    def series(self, series_id: str) -> pd.DataFrame:
+        """Stored observations (date, value, known_date), oldest first."""
+        with self._lock:
+            if series_id not in self._series:
+                path = self._path(series_id)
+                if os.path.exists(path):
+                    df = pd.read_csv(path, parse_dates=["date", "known_date"])
+                else:
+                    df = pd.DataFrame({"date": pd.to_datetime([]), "value": [], "known_date": pd.to_datetime([])})
+                self._series[series_id] = df
+            return self._series[series_id]
+
+    # ----------------------- updates -----------------------
+    def update(self, series_id: str) -> int:
+        """Fetch observations newer than the stored tail; returns rows added."""
+        stored = self.series(series_id)
+        params = {"series_id": series_id}
+        if not stored.empty:
+            start = stored["date"].iloc[max(0, len(stored) - REVISION_OVERLAP)]
+            params["observation_start"] = start.strftime("%Y-%m-%d")
+
+        observations = get_json("fred", "/series/observations", params, use_cache=False).get("observations", [])
+        new = pd.DataFrame(observations, columns=["date", "value"])
+        new["date"] = pd.to_datetime(new["date"])
+        new["value"] = pd.to_numeric(new["value"], errors="coerce")    # FRED uses "." for missing
+        new = new.dropna()
+        new["known_date"] = new["date"] + pd.Timedelta(days=PUBLICATION_LAG_DAYS.get(series_id, 0))
+
+        merged = pd.concat([stored, new])
+        merged = merged.drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self._path(series_id)}.{os.getpid()}.tmp"
+        merged.to_csv(tmp_path, index=False, date_format="%Y-%m-%d")
+        os.replace(tmp_path, self._path(series_id))
+        with self._lock:
+            self._series[series_id] = merged
+        return len(merged) - len(stored)
+
+    def update_all(self) -> dict:
+        return {series_id: self.update(series_id) for series_id in SERIES_IDS.values()}
+
+    # ----------------------- reads -----------------------
+    def latest(self, series_id: str):
+        """Most recent stored value, or None if the series is empty."""
+        df = self.series(series_id)
+        return None if df.empty else df["value"].iloc[-1]
+
+    def as_of(self, dates, fallback=None) -> pd.DataFrame:
+        """Macro columns for each date, using only values released on or before it.
+
+        Days before a series' first known release, or series not stored yet,
+        take the value from `fallback` (a row of realtime_marco.csv) when given.
+        """
+        dates = pd.DatetimeIndex(dates)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        dates = dates.normalize()
+        out = pd.DataFrame(index=dates)
+        for col, series_id in SERIES_IDS.items():
+            df = self.series(series_id).sort_values("known_date")
+            values = np.full(len(dates), np.nan)
+            if not df.empty:
+                pos = np.searchsorted(df["known_date"].values, dates.values, side="right") - 1
+                known = pos >= 0
+                values[known] = df["value"].values[pos[known]]
+            out[col] = values
+            if fallback is not None:
+                out[col] = out[col].fillna(float(fallback[col]))
+        for col in FALLBACK_ONLY_COLS:
+            if fallback is not None and col in fallback:
+                out[col] = float(fallback[col])
+        return out
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_macro_store() -> MacroStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MacroStore()
+    return _store
+
+
+if __name__ == "__main__":
+    from replay import install_from_env
+    install_from_env()
+    for series_id, added in get_macro_store().update_all().items():
+        print(f"{series_id}: +{added}")
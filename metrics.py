@@ -0,0 +1,196 @@
+"""Process-wide latency histograms for the app's stages.
+
+    with span("provider.request", provider="fmp", endpoint="/profile"):
+        ...
+
+Every span adds its duration to the histogram for (stage, labels) and,
+if the block raised, to that series' error count. A ring buffer keeps
+the most recent spans for the admin page (page3.py).
+
+Exports:
+    prometheus_text()   Prometheus text exposition format
+    to_json()           the same series with p50/p95/p99 from recent samples
+    start_metrics_server(port) serves /metrics and /metrics.json on 127.0.0.1
+
+Set METRICS_PORT to have streamlit_app.py start the server.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Recent durations kept per series for the percentiles in to_json()
+SAMPLES_PER_SERIES = 1024
+RECENT_SPANS = 500
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0)) or None
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "errors", "samples")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # the last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=SAMPLES_PER_SERIES)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.errors += error
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples = np.array(self.samples) if self.samples else np.zeros(1)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+        }
+
+
+class Registry:
+
+    def __init__(self):
+        self._series = {}   # (stage, ((label, value), ...)) -> Histogram
+        self._recent = deque(maxlen=RECENT_SPANS)
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: bool = False, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram()
+            histogram.observe(seconds, error)
+            self._recent.append((time.time(), stage, labels, seconds, error))
+
+    def series(self) -> list:
+        """[(stage, labels dict, summary dict)] sorted by stage and labels."""
+        with self._lock:
+            return [(stage, dict(labels), h.summary()) for (stage, labels), h in sorted(self._series.items())]
+
+    def recent(self) -> list:
+        with self._lock:
+            return [
+                {"time": t, "stage": stage, "labels": labels, "seconds": seconds, "error": error}
+                for t, stage, labels, seconds, error in reversed(self._recent)
+            ]
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP app_stage_seconds Latency of instrumented app stages.",
+            "# TYPE app_stage_seconds histogram",
+        ]
+        errors = []
+        with self._lock:
+            for (stage, labels), h in sorted(self._series.items()):
+                base = ",".join([f'stage="{stage}"'] + [f'{k}="{v}"' for k, v in labels])
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), h.counts):
+                    cumulative += count
+                    lines.append(f'app_stage_seconds_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f"app_stage_seconds_sum{{{base}}} {h.total:.6f}")
+                lines.append(f"app_stage_seconds_count{{{base}}} {h.count}")
+                errors.append(f"app_stage_errors_total{{{base}}} {h.errors}")
+        lines += ["# HELP app_stage_errors_total Instrumented stage calls that raised.",
+                  "# TYPE app_stage_errors_total counter"] + errors
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps([
+            {"stage": stage, "labels": labels, **summary} for stage, labels, summary in self.series()
+        ])
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._recent.clear()
+
+
+registry = Registry()
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """Time the block into the (stage, labels) histogram."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        registry.observe(stage, time.perf_counter() - start, error, **labels)
+
+
+def timed(stage: str, **labels):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(stage: str, seconds: float, error: bool = False, **labels):
+    registry.observe(stage, seconds, error, **labels)
+
+
+def prometheus_text() -> str:
+    return registry.prometheus_text()
+
+
+def to_json() -> str:
+    return registry.to_json()
+
+
+def start_metrics_server(port: int = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port or METRICS_PORT or 9108), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -42,4 +42,12 @@ class LSTMVolumePredictor(nn.Module):
         _, (hn, _) = self.lstm(x)        # hn: (num_layers, batch, hidden)
         last_hidden = hn[-1]             # (batch, hidden_size)
 
-        return self.fc(last_hidden)      # (batch, 1)
\ No newline at end of file
+        return self.fc(last_hidden)      # (batch, 1)
+
+    # ----------------------- stateful step -----------------------
+    def forward_with_state(self, x, state=None):
+        # x: (batch, time_steps, input_size), state: (h, c) from a previous call
+
+        _, (hn, cn) = self.lstm(x, state)  # hn, cn: (num_layers, batch, hidden)
+
+        return self.fc(hn[-1]), (hn, cn)
\ No newline at end of file
@@ -31,3 +31,7 @@ class LSTMVolumePredictor(nn.Module):
         _, (hn, _) = self.lstm(x)
         last_hidden = hn[-1]
         return self.fc(last_hidden)
+
+    def forward_with_state(self, x, state=None):
+        _, (hn, cn) = self.lstm(x, state)
+        return self.fc(hn[-1]), (hn, cn)
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+
+import torch
+
+from inference_optim import build_variant, check_parity, parity_batch, set_inference_threads
+from metrics import span
+from model import LSTMVolumePredictor
+
+
+# --- Model files shipped with the app ---
+MODEL_FILES = {
+    "volatility": "lstm_volatility_model.pkl",
+    "volume": "lstm_volume_model.pkl",
+}
+
+WARMUP_TIME_STEPS = 30
+
+# CPU serving options: float, int8, traced or int8-traced (see inference_optim.py)
+MODEL_VARIANT = os.environ.get("MODEL_VARIANT", "float")
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 0)) or None
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    # The pickles were written from a notebook, so the class is recorded as
+    # __main__.LSTMVolumePredictor. Point it at model.py instead.
+    def find_class(self, module, name):
+        if name == "LSTMVolumePredictor":
+            return LSTMVolumePredictor
+        return super().find_class(module, name)
+
+
+def _file_version(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def load_model(path: str) -> LSTMVolumePredictor:
+    with open(path, "rb") as f:
+        model = _ModelUnpickler(f).load()
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def warm_up(model, input_size: int, time_steps: int = WARMUP_TIME_STEPS):
+    # One dummy forward pass so the first real request does not pay for
+    # kernel selection and allocator warm-up.
+    x = torch.zeros(1, time_steps, input_size)
+    with torch.inference_mode():
+        model(x)
+
+
+def _batch_bucket(size: int) -> str:
+    # Batch sizes grouped by power of two keep the number of metric series small
+    return "1" if size <= 1 else f"<={1 << (size - 1).bit_length()}"
+
+
+class ModelRegistry:
+    """Loads each model once per process and hands out the ready instance."""
+
+    def __init__(self, variant: str = "float"):
+        self.variant = variant
+        self._models = {}       # (name, version) -> model
+        self._input_sizes = {}  # (name, version) -> features per time step
+        self._latest = {}       # name -> version
+        self.parity = {}        # name -> check_parity() result of the configured variant
+        self._lock = threading.Lock()
+
+    def _optimize(self, name: str, model: LSTMVolumePredictor):
+        """The configured variant, or the float model if it fails the parity check."""
+        if self.variant == "float":
+            return model, "float"
+        optimized = build_variant(model, self.variant)
+        parity = check_parity(model, optimized, parity_batch(name, model.lstm.input_size))
+        self.parity[name] = parity
+        if not parity["ok"]:
+            logger.warning("%s: %s variant rejected, relative error %.4f on feature windows; serving float",
+                           name, self.variant, parity["relative_error"])
+            return model, "float"
+        return optimized, self.variant
+
+    def register(self, name: str, path: str, version: str = None):
+        version = version or _file_version(path)
+        with self._lock, span("model.load", model=name):
+            model = load_model(path)
+            input_size = model.lstm.input_size
+            model, variant = self._optimize(name, model)
+            if variant != "float":
+                version = f"{version}-{variant}"
+            if (name, version) not in self._models:
+                warm_up(model, input_size)
+                self._models[(name, version)] = model
+                self._input_sizes[(name, version)] = input_size
+            self._latest[name] = version
+        return version
+
+    def _key(self, name: str, version: str = None) -> tuple:
+        if name not in self._latest:
+            raise KeyError(f"Unknown model: {name}")
+        key = (name, version or self._latest[name])
+        if key not in self._models:
+            raise KeyError(f"Unknown version {key[1]} for model {name}")
+        return key
+
+    def get(self, name: str, version: str = None):
+        with self._lock:
+            return self._models[self._key(name, version)]
+
+    def input_size(self, name: str, version: str = None) -> int:
+        with self._lock:
+            return self._input_sizes[self._key(name, version)]
+
+    def version(self, name: str) -> str:
+        return self._latest[name]
+
+    def names(self) -> list:
+        return sorted(self._latest)
+
+    def predict(self, name: str, X, version: str = None):
+        """Run a forward pass on X of shape (batch, time_steps, features)."""
+        with self._lock:
+            key = self._key(name, version)
+            model, input_size = self._models[key], self._input_sizes[key]
+        X = torch.as_tensor(X, dtype=torch.float32)
+        if X.ndim == 2:
+            X = X.unsqueeze(0)
+        if X.shape[-1] != input_size:
+            raise ValueError(
+                f"Model '{name}' expects {input_size} features, got {X.shape[-1]}"
+            )
+        with torch.inference_mode(), span("model.forward", model=name, batch=_batch_bucket(len(X))):
+            return model(X).numpy()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry with every model in MODEL_FILES loaded and warmed up."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            set_inference_threads(INFERENCE_THREADS)
+            registry = ModelRegistry(MODEL_VARIANT)
+            for name, path in MODEL_FILES.items():
+                registry.register(name, path)
+            _registry = registry
+    return _registry
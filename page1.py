@@ -1,14 +1,22 @@
 import streamlit as st
 import pandas as pd
 import requests
-import random
-import datetime
-import yfinance as yf
+import os
 import time
-import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-from model import LSTMVolumePredictor
+from features import assemble_features
+from price_store import get_price_store
+from macro_store import get_macro_store
+from prediction_table import load_latest_table, lookup
+from quotes import fetch_related_quotes
+from sparkline import sparkline_svg
+from cache_warmer import record_view
+from metrics import observe, span
+from providers import (
+    fetch_profile, company_info_from_profile, company_metrics_from_profile,
+    fetch_related_information, prefetch_company, PREFETCH_ON_SELECT
+)
+from peer_index import find_peers
 
 
 # ---- Opening Animation ----
@@ -31,109 +39,41 @@ st.caption("Predict future volatility and trading activity of stocks based on de
 st.markdown("---")
 
 
-FMP_API_KEY = st.secrets["FMP_API_KEY"]
-
 @st.cache_data
 def load_macro_data():
     return pd.read_csv("realtime_marco.csv")
 macro_df = load_macro_data()
 
-# 拉取公司基本信息
-def get_company_info(symbol: str) -> dict:
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/profile/{symbol}/'
-    params = {'apikey': FMP_API_KEY}
-
+# 拉取公司基本信息（原始 profile，公司信息和模型特征共用）
+def get_company_profile(symbol: str):
     try:
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if isinstance(data, list) and len(data) > 0:
-            data = data[0]
-        else:
-            st.error(f"No data found for symbol: {symbol}")
-            return None
-
-        company_info = {
-            'Name': data.get('companyName', 'N/A'),
-            'Sector': data.get('sector', 'N/A'),
-            'Website': data.get('website', 'N/A'),
-            'Image': data.get('image', 'N/A')
-        }
-
-        return company_info
-
+        profile = fetch_profile(symbol)
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching data: {e}")
         return None
-
     except ValueError as e:
         st.error(f"Error parsing JSON response: {e}")
         return None
 
+    if profile is None:
+        st.error(f"No data found for symbol: {symbol}")
+    return profile
+
+def get_company_info(profile: dict) -> dict:
+    return company_info_from_profile(profile) if profile else None
+
 def find_related_tickers(current_symbol: str, sector: str) -> list:
-    
     try:
-        # 调用 FMP API 拉取同 Sector 的所有公司
-        url = f"https://financialmodelingprep.com/api/v3/stock-screener"
-        params = {
-            "sector": sector,
-            "limit": 5, 
-            "apikey": FMP_API_KEY
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        tickers = [item['symbol'] for item in data if item['symbol'].upper() != current_symbol.upper()]
-        return tickers
-
+        # 同行业/同 Sector 的公司来自本地 peer index，不再请求 FMP
+        return find_peers(current_symbol, sector)
     except Exception as e:
         st.error(f"Error finding related tickers: {e}")
         return []
 
-import yfinance as yf
-import streamlit as st
-import matplotlib.pyplot as plt
-
-def plot_mini_sparkline(data, color):
-    fig, ax = plt.subplots(figsize=(2.5, 1.2))
-    ax.plot(data, linewidth=2, color=color)
-    ax.set_xticks([])
-    ax.set_yticks([])
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    ax.set_facecolor('none')
-    fig.patch.set_facecolor('none')
-    plt.tight_layout(pad=0)
-    return fig
-
-
 def display_related_stocks(main_ticker):
     related_symbols = ticker_to_related.get(main_ticker.upper(), ticker_to_related["DEFAULT"])
-    related_stocks = []
-
-    for sym in related_symbols:
-        try:
-            stock = yf.Ticker(sym)
-            hist = stock.history(period="7d", interval="1h")  # 更高频率，更像 Google 样式
-
-            if hist is None or hist.empty or len(hist) < 2:
-                continue
-
-            price_today = hist['Close'].iloc[-1]
-            price_yesterday = hist['Close'].iloc[-2]
-            change_pct = ((price_today - price_yesterday) / price_yesterday) * 100
-
-            related_stocks.append({
-                "symbol": sym,
-                "name": stock.info.get('shortName', sym),
-                "price": price_today,
-                "change_pct": change_pct,
-                "price_trend": hist["Close"].values  # 提取 numpy 数组用于绘图
-            })
-        except Exception as e:
-            st.error(f"Error fetching data for {sym}: {e}")
+    # 一次批量拉取所有相关股票的小时线，名称来自本地元数据表
+    related_stocks = fetch_related_quotes(related_symbols, interval="1h", days=7)  # 更高频率，更像 Google 样式
 
     st.header("🔎 People Also Search")
 
@@ -159,81 +99,52 @@ def display_related_stocks(main_ticker):
 
             # 小图表部分
             line_color = "green" if stock["change_pct"] >= 0 else "red"
-            fig = plot_mini_sparkline(stock["price_trend"], line_color)
-
-            st.pyplot(fig)
-
-
-
-def get_company_metrics(ticker):
-    url = f"https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={FMP_API_KEY}"
-    response = requests.get(url)
-    data = response.json()
-    if not data:
-        return {key: 0.0 for key in [
-            "divyield", "beta", "marketCap", "averageVolume", "price"
-        ]}
-    profile = data[0]
-    return {
-        "divyield": profile.get("lastDividend", 0.0),
-        "beta": profile.get("beta", 0.0),
-        "marketCap": profile.get("marketCap", 0.0),
-        "averageVolume": profile.get("averageVolume", 0.0),
-        "price": profile.get("price", 0.0)
-    }
-
-# --- 构建特征函数（volatility 专用） ---
-def get_features_for_prediction(ticker):
-    lookback_days = 30
-    df = yf.download(ticker, period="60d", interval="1d").dropna().tail(lookback_days)
-    df["PRC"] = df["Close"]
-    df["Momentum"] = df["Close"].pct_change(5).fillna(0)
-    df["Volatility_5d"] = df["Close"].pct_change().rolling(5).std().fillna(0)
-
-    macro_cols = [
-        "GDP", "CPI", "Unemployment Rate", "Federal Funds Rate",
-        "Personal Consumption Expenditures", "Industrial Production", "Retail Sales",
-        "M2 Money Stock", "VIX", "TED Spread", "sentiment_score"
-    ]
-    macro_row = macro_df.iloc[-1]
-    for col in macro_cols:
-        df[col] = macro_row[col]
-
-    firm_cols = [
-        "bm", "divyield", "capei", "gpm", "npm", "roa", "roe",
-        "capital_ratio", "de_ratio", "quick_ratio", "inv_turn"
-    ]
-    firm_data = get_company_metrics(ticker)
-    for col in firm_cols:
-        df[col] = firm_data[col]
-
-    feature_cols = [
-        "PRC", "Volatility_5d", "Momentum", "sentiment_score",
-        *macro_cols[:-1], *firm_cols  # sentiment_score 已加过
-    ]
-    return df[feature_cols].values
-
-# --- Volume 模型特征 ---
-def get_features_for_prediction_volume(ticker):
-    X = get_features_for_prediction(ticker)
-    vol_df = yf.download(ticker, period="60d", interval="1d").dropna().tail(30)
-    X[:, 1] = vol_df["Volume"].values  # 替换 Volatility_5d 为 VOL
-    return X
+            svg = sparkline_svg(stock["symbol"], stock["last_bar"], stock["price_trend"], line_color)
+
+            st.markdown(svg, unsafe_allow_html=True)
+
+
+
+# --- 特征组装：价格和 profile 各拉取一次，两个模型共用 ---
+def get_prediction_features(ticker, profile):
+    df = get_price_store().history(ticker, interval="1d", days=60)
+    # 每一天使用当时已发布的宏观数据（本地存储，无实时 FRED 请求）
+    macro = get_macro_store().as_of(df.index, fallback=macro_df.iloc[-1])
+    return assemble_features(df, macro, company_metrics_from_profile(profile))
 
 # --- 模型预测逻辑 ---
-def predict_volatility(ticker):
-    with open("lstm_volatility_model.pkl", "rb") as f:
-        model = pickle.load(f)
-    X = get_features_for_prediction(ticker)
-    X = np.expand_dims(X, axis=0)
-    return round(float(model.predict(X)[0][0]), 4)
+# With PREDICTION_SERVICE_URL set, forward passes go to the shared local
+# prediction service (prediction_service.py), which micro-batches requests
+# from all sessions. Otherwise models are loaded, put in eval mode and
+# warmed up once per process, then shared by every session.
+PREDICTION_SERVICE_URL = os.environ.get("PREDICTION_SERVICE_URL")
+
+# torch 只在真正需要模型时导入（streamlit_app.py 会在后台预加载）
+@st.cache_resource
+def load_model_registry():
+    from model_registry import get_registry
+    return get_registry()
+
+@st.cache_resource
+def prediction_client():
+    from prediction_service import PredictionClient
+    return PredictionClient(PREDICTION_SERVICE_URL)
+
+def run_model(name, X):
+    if PREDICTION_SERVICE_URL:
+        return prediction_client().predict(name, X)
+    return float(load_model_registry().predict(name, np.expand_dims(X, axis=0))[0][0])
 
-def predict_volume(ticker):
-    with open("lstm_volume_model.pkl", "rb") as f:
-        model = pickle.load(f)
-    X = get_features_for_prediction_volume(ticker)
-    X = np.expand_dims(X, axis=0)
-    return int(model.predict(X)[0][0])
+def predict_volatility(features):
+    return round(run_model("volatility", features["volatility"]), 4)
+
+def predict_volume(features):
+    return int(run_model("volume", features["volume"]))
+
+# Nightly table written by batch_inference.py
+@st.cache_data(ttl=60 * 60)
+def load_prediction_table():
+    return load_latest_table()
 
 
 # --- Ticker Selection ---
@@ -246,50 +157,42 @@ predict_button = st.button("Predict")
 predicted_volatility = None
 predicted_volume = None
 
-ticker_to_related = {}  # 动态生成ticker_to_related字典
+ticker_to_related = {"DEFAULT": []}  # 动态生成ticker_to_related字典；DEFAULT 为空，避免KeyError
 
 if selected_ticker:
-        # 获取选中ticker的公司信息
-        info = get_company_info(selected_ticker)
-        # 查找同Sector的其他公司
-        related_tickers = find_related_tickers(selected_ticker, info['Sector'])
-
-        if related_tickers:
-            # 动态生成 ticker_to_related 字典
-            ticker_to_related[selected_ticker.upper()] = related_tickers
-        else:
-            ticker_to_related[selected_ticker.upper()] = []  # 没找到就空列表
-
-        # 给DEFAULT也一个空的，避免KeyError
-        ticker_to_related["DEFAULT"] = []
+        # 浏览列表不触发网络请求；可选地在后台预取当前高亮的ticker
+        if PREFETCH_ON_SELECT and st.session_state.get("prefetched_ticker") != selected_ticker:
+            prefetch_company(selected_ticker)
+            st.session_state["prefetched_ticker"] = selected_ticker
 else:
         st.error("Ticker not found.")
 
 
 # --- After Clicking Predict ---
 if predict_button:
-    with st.spinner("Predicting..."):
-        import random
-
-        # --- Simulate volatility ---
-        def simulate_predicted_volatility(selected_ticker):
-            # Volatility均值0.03，标准差0.01，更贴近真实
-            volatility = random.gauss(0.03, 0.01)
-            return round(max(0.01, min(volatility, 0.06)), 2)
-
-        # --- Simulate volume ---
-        def simulate_predicted_volume(selected_ticker):
-            # Volume均值1000万，标准差500万
-            volume = int(random.gauss(10_000_000, 5_000_000))
-            return max(1_000_000, min(volume, 50_000_000))
-
-        # --- Predict based on selected ticker ---
-        predicted_volatility = simulate_predicted_volatility(selected_ticker)
-        predicted_volume = simulate_predicted_volume(selected_ticker)
+    predict_started = time.perf_counter()  # 整个点击流程的耗时，见 Admin 页面
+    record_view(selected_ticker)  # 热门ticker优先预热缓存
+    # 点击 Predict 后才获取选中ticker的公司信息和同Sector的其他公司
+    profile = get_company_profile(selected_ticker)
+    info = get_company_info(profile)
+    related_tickers = find_related_tickers(selected_ticker, info['Sector']) if info else []
+    ticker_to_related[selected_ticker.upper()] = related_tickers  # 没找到就空列表
 
+    with st.spinner("Predicting..."):
         # --- Predict based on selected ticker ---
-        predicted_volatility = simulate_predicted_volatility(selected_ticker)
-        predicted_volume = simulate_predicted_volume(selected_ticker)
+        # Use the nightly batch table when it has this ticker, otherwise run
+        # the models (or the prediction service) on the live feature window
+        precomputed = lookup(load_prediction_table(), selected_ticker)
+        if precomputed:
+            predicted_volatility = round(float(precomputed["predicted_volatility"]), 4)
+            predicted_volume = int(precomputed["predicted_volume"])
+        elif profile:
+            try:
+                features = get_prediction_features(selected_ticker, profile)
+                predicted_volatility = predict_volatility(features)
+                predicted_volume = predict_volume(features)
+            except Exception as e:
+                st.error(f"Prediction failed: {e}")
 
 
 
@@ -342,8 +245,7 @@ if predict_button:
 
     # 2. Fetch Past 30 Trading Days Data from Yahoo Finance
     try:
-        stock = yf.Ticker(selected_ticker)
-        hist = stock.history(period="60d")  # Fetch 60 days in case of non-trading days
+        hist = get_price_store().history(selected_ticker, interval="1d", days=60)  # Fetch 60 days in case of non-trading days
         hist = hist.tail(30)
 
         avg_volatility = (hist['High'] - hist['Low']).mean() / hist['Close'].mean()
@@ -354,133 +256,23 @@ if predict_button:
         avg_volume = None
 
     # ====================
-    # --- Auto-Refresh Content (Updated every 5 min) ---
+    # --- Related Information ---
+    # Responses are shared across sessions by the TTL cache in http_client
+    # (news refreshes every 5 min, macro daily, key metrics quarterly)
     # ====================
 
     st.header(" 💡 Related Information")
 
-    refresh_interval = 5 * 60  # 5 minutes in seconds
-    last_refresh = st.session_state.get("last_refresh", 0)
-
-    current_time = time.time()
-    if current_time - last_refresh > refresh_interval:
-        st.session_state["last_refresh"] = current_time
-        # get real-time financial news 
-        def fetch_real_time_news_finnhub(ticker):
-            api_key = "cvt5it1r01qhup0ude90cvt5it1r01qhup0ude9g"  
-            base_url = "https://finnhub.io/api/v1/company-news"
-
-            today = datetime.date.today()
-            seven_days_ago = today - datetime.timedelta(days=7)
-
-            from_date = seven_days_ago.strftime("%Y-%m-%d")
-            to_date = today.strftime("%Y-%m-%d")
-
-            url = f"{base_url}?symbol={ticker}&from={from_date}&to={to_date}&token={api_key}"
-
-            response = requests.get(url)
-            if response.status_code == 200:
-               data = response.json()
-               if len(data) == 0:
-                 return [("No recent news found.", None)]  
-               news_list = [(article['headline'], article['url']) for article in data[:3]]
-               return news_list
-            else:
-              return [("Error fetching news.", None)]       
-
-        st.session_state["news_items"] = fetch_real_time_news_finnhub(selected_ticker)
-
-        #get real-time macro data
-        def fetch_macro_data():
-            fred_api_key = "8e5a7198d8f2aa4127b994c6817400d5"
-            base_url = "https://api.stlouisfed.org/fred/series/observations"
-
-            # Example: Get GDP Growth, CPI Inflation, Unemployment Rate
-            gdp_url = f"{base_url}?series_id=GDP&api_key={fred_api_key}&file_type=json"
-            cpi_url = f"{base_url}?series_id=CPIAUCSL&api_key={fred_api_key}&file_type=json"
-            unemployment_url = f"{base_url}?series_id=UNRATE&api_key={fred_api_key}&file_type=json"
-
-            gdp = requests.get(gdp_url).json()["observations"][-1]["value"]
-            cpi = requests.get(cpi_url).json()["observations"][-1]["value"]
-            unemployment = requests.get(unemployment_url).json()["observations"][-1]["value"]
+    # News, macro, fundamentals and corporate actions are fetched in
+    # parallel; a slow provider only blanks its own tab
+    related_info, related_errors = fetch_related_information(selected_ticker)
+    for message in related_errors.values():
+        st.error(message)
 
-            return {
-                "GDP (billion dollars)": gdp,
-                "CPI Inflation": f"{cpi}%",
-                "Unemployment Rate": f"{unemployment}%"
-            }
-        
-        st.session_state["macro_data"] = fetch_macro_data()
-
-         #get real-time technical indicators
-        def fetch_fundamentals(ticker):
-            FMP_API_KEY = st.secrets["FMP_API_KEY"]
-            url = f"https://financialmodelingprep.com/api/v3/key-metrics/{ticker}?apikey={FMP_API_KEY}&limit=1"
-
-
-            try:
-                response = requests.get(url)
-                data = response.json()
-
-                if isinstance(data, list) and len(data) > 0:
-                    fundamentals = data[0]
-                else:
-                    return {
-                        "ROA": "N/A",
-                        "ROE": "N/A",
-                        "Dividend Yield": "N/A"
-                    }
-
-                return {
-                    "ROA": f"{float(fundamentals.get('returnOnTangibleAssets', 0)) * 100:.2f}%" if fundamentals.get('returnOnTangibleAssets') is not None else "N/A",
-                    "ROE": f"{float(fundamentals.get('roe', 0)) * 100:.2f}%" if fundamentals.get('roe') is not None else "N/A",
-                    "Dividend Yield": fundamentals.get('dividendYield', 'N/A')
-                }
-
-            except Exception as e:
-                st.error(f"Error fetching fundamentals: {e}")
-                return {
-                    "ROA": "N/A",
-                    "ROE": "N/A",
-                    "Dividend Yield": "N/A"
-                }
-        st.session_state["fundamentals_data"] = fetch_fundamentals(selected_ticker)
-
-    
-         #get real-time corporate actions data
-        import requests
-        import random
-
-        def fetch_corporate_actions(ticker):
-            api_key = "Y16JFTL2T7VKTAEA" 
-            url = f"https://www.alphavantage.co/query?function=DIVIDENDS&symbol={ticker}&apikey={api_key}"
-
-            response = requests.get(url)
-            data = response.json()
-
-            # Now data should be a list of dividend events
-            if isinstance(data, list) and len(data) > 0:
-                # Take the most recent dividend event
-                latest_dividend = data[0]  # assuming the API returns sorted latest first
-                dividend_amount = latest_dividend.get('dividend', "0.0")
-            else:
-                dividend_amount = "0.0"
-
-            return {
-                "Dividend Amount": f"${dividend_amount}",
-                "Share Buyback": random.choice(["Ongoing", "None announced"])  # Still mock buyback info
-            }
-
-        # Then in your Streamlit refresh block:
-        st.session_state["corporate_action_data"] = fetch_corporate_actions(selected_ticker)
-
-
-
-    # Access refreshed data
-    news_items = st.session_state.get("news_items", ["Loading..."])
-    macro_data = st.session_state.get("macro_data", {})
-    fundamentals_data = st.session_state.get("fundamentals_data", {})
-    corporate_action_data = st.session_state.get("corporate_action_data", {})
+    news_items = related_info["news"]
+    macro_data = related_info["macro"]
+    fundamentals_data = related_info["fundamentals"]
+    corporate_action_data = related_info["corporate_actions"]
 
     tab_titles = ["Real-time News", "Macroeconomic Factors", "Fundamentals", "Corporate Actions"]
     tabs = st.tabs(tab_titles)
@@ -546,6 +338,8 @@ if predict_button:
                 """,
                 unsafe_allow_html=True
             )
-    display_related_stocks(selected_ticker)
+    with span("page.related_stocks", page="page1"):
+        display_related_stocks(selected_ticker)
 
-    st.markdown("---")
\ No newline at end of file
+    st.markdown("---")
+    observe("page.render", time.perf_counter() - predict_started, page="page1")
\ No newline at end of file
@@ -1,75 +1,40 @@
 import streamlit as st
 import pandas as pd
-import requests
-import datetime
 import time
-import yfinance as yf
-import os
-import random
-
-# --- API Keys ---
-FMP_API_KEY = st.secrets.get("FMP_API_KEY", "")
-FINNHUB_API_KEY = st.secrets.get("FINNHUB_API_KEY", "")
-FRED_API_KEY = st.secrets.get("FRED_API_KEY", "")
-ALPHA_VANTAGE_API_KEY = st.secrets.get("ALPHA_VANTAGE_API_KEY", "")
+from quotes import fetch_related_quotes
+from cache_warmer import record_view
+from metrics import observe, span
+from providers import (
+    fetch_profile, company_info_from_profile, fetch_real_time_news, fetch_fred_latest,
+    fetch_fundamentals, fetch_corporate_actions, fetch_related_information,
+    prefetch_company, PREFETCH_ON_SELECT
+)
+from peer_index import find_peers
+
+# Provider keys and timeouts are configured in http_client.py
 
 # --- Helper Functions ---
 def get_company_info(symbol: str) -> dict:
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/profile/{symbol}/'
-    params = {'apikey': FMP_API_KEY}
     try:
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if isinstance(data, list) and len(data) > 0:
-            data = data[0]
-        else:
+        profile = fetch_profile(symbol)
+        if profile is None:
             st.error(f"No data found for symbol: {symbol}")
             return None
-
-        return {
-            'Name': data.get('companyName', 'N/A'),
-            'Sector': data.get('sector', 'N/A'),
-            'Website': data.get('website', 'N/A'),
-            'Image': data.get('image', 'N/A')
-        }
+        return company_info_from_profile(profile)
     except Exception as e:
         st.error(f"Error fetching company info: {e}")
         return None
 
 def find_related_tickers(current_symbol: str, sector: str) -> list:
     try:
-        url = "https://financialmodelingprep.com/api/v3/stock-screener"
-        params = {"sector": sector, "limit": 5, "apikey": FMP_API_KEY}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        tickers = [item['symbol'] for item in data if item['symbol'].upper() != current_symbol.upper()]
-        return tickers
+        return find_peers(current_symbol, sector)
     except Exception as e:
         st.error(f"Error finding related tickers: {e}")
         return []
 
 def display_related_stocks(main_ticker, related_symbols):
     st.header(" 🔎 People Also Search")
-    related_stocks = []
-    for sym in related_symbols:
-        try:
-            stock = yf.Ticker(sym)
-            hist = stock.history(period="2d")
-            if hist is None or hist.empty or len(hist) < 2:
-                continue
-            price_today = hist['Close'].iloc[-1]
-            price_yesterday = hist['Close'].iloc[-2]
-            change_pct = ((price_today - price_yesterday) / price_yesterday) * 100
-            related_stocks.append({
-                "symbol": sym,
-                "name": stock.info.get('shortName', sym),
-                "price": price_today,
-                "change_pct": change_pct
-            })
-        except Exception as e:
-            st.error(f"Error fetching data for {sym}: {e}")
+    related_stocks = fetch_related_quotes(related_symbols, interval="1d", days=7)
 
     if related_stocks:
         cols = st.columns(len(related_stocks))
@@ -90,75 +55,6 @@ def display_related_stocks(main_ticker, related_symbols):
                     </div>
                 """, unsafe_allow_html=True)
 
-def fetch_real_time_news(ticker):
-    try:
-        today = datetime.date.today()
-        seven_days_ago = today - datetime.timedelta(days=7)
-        url = f"https://finnhub.io/api/v1/company-news?symbol={ticker}&from={seven_days_ago}&to={today}&token={FINNHUB_API_KEY}"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if len(data) == 0:
-            return [("No recent news found.", None)]
-        return [(article['headline'], article['url']) for article in data[:3]]
-    except Exception as e:
-        st.error(f"Error fetching news: {e}")
-        return [("Error fetching news.", None)]
-
-def fetch_macro_data():
-    try:
-        base_url = f"https://api.stlouisfed.org/fred/series/observations"
-        def get_value(series_id):
-            url = f"{base_url}?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-            resp = requests.get(url)
-            obs = resp.json().get("observations", [])
-            if obs:
-                return obs[-1]["value"]
-            return "N/A"
-        return {
-            "GDP (Billion Dollars)": get_value("GDP"),
-            "CPI Inflation Rate": f"{get_value('CPIAUCSL')}%",
-            "Unemployment Rate": f"{get_value('UNRATE')}%"
-        }
-    except Exception as e:
-        st.error(f"Error fetching macro data: {e}")
-        return {}
-
-def fetch_fundamentals(ticker):
-    try:
-        url = f"https://financialmodelingprep.com/api/v3/key-metrics/{ticker}?apikey={FMP_API_KEY}&limit=1"
-        response = requests.get(url)
-        data = response.json()
-        if isinstance(data, list) and len(data) > 0:
-            fundamentals = data[0]
-            return {
-                "ROA": f"{float(fundamentals.get('returnOnTangibleAssets', 0)) * 100:.2f}%" if fundamentals.get('returnOnTangibleAssets') else "N/A",
-                "ROE": f"{float(fundamentals.get('roe', 0)) * 100:.2f}%" if fundamentals.get('roe') else "N/A",
-                "Dividend Yield": fundamentals.get('dividendYield', 'N/A')
-            }
-        return {}
-    except Exception as e:
-        st.error(f"Error fetching fundamentals: {e}")
-        return {}
-
-def fetch_corporate_actions(ticker):
-    try:
-        url = f'https://www.alphavantage.co/query?function=DIVIDEND_HISTORY&symbol={ticker}&apikey={ALPHA_VANTAGE_API_KEY}'
-        r = requests.get(url)
-        data = r.json().get('data', [])
-        if data:
-            latest_dividend = data[0]
-            dividend_amount = latest_dividend.get('dividend', "0.0")
-        else:
-            dividend_amount = "0.0"
-        return {
-            "Dividend Amount": f"${dividend_amount}",
-            "Share Buyback": random.choice(["Ongoing", "None announced"])
-        }
-    except Exception as e:
-        st.error(f"Error fetching corporate actions: {e}")
-        return {}
-
 # --- Page Content ---
 st.title("🏢 Company Basic Information")
 
@@ -170,12 +66,19 @@ predict_button = st.button("Select")
 info = None
 related_tickers = []
 
-if selected_ticker:
+# Browsing the list costs no network calls; optionally warm the cache for
+# the highlighted ticker in the background
+if selected_ticker and PREFETCH_ON_SELECT and st.session_state.get("prefetched_ticker") != selected_ticker:
+    prefetch_company(selected_ticker)
+    st.session_state["prefetched_ticker"] = selected_ticker
+
+if predict_button:
+    select_started = time.perf_counter()
+    record_view(selected_ticker)
     info = get_company_info(selected_ticker)
     if info:
         related_tickers = find_related_tickers(selected_ticker, info['Sector'])
 
-if predict_button:
     if info:
         col1, col2, col3 = st.columns([2, 2, 5])
         with col1:
@@ -196,14 +99,20 @@ if predict_button:
                 """, unsafe_allow_html=True)
         st.markdown("---")
 
-    display_related_stocks(selected_ticker, related_tickers)
+    with span("page.related_stocks", page="page2"):
+        display_related_stocks(selected_ticker, related_tickers)
 
     st.header(" 💡 Related Information")
 
-    news_items = fetch_real_time_news(selected_ticker)
-    macro_data = fetch_macro_data()
-    fundamentals_data = fetch_fundamentals(selected_ticker)
-    corporate_action_data = fetch_corporate_actions(selected_ticker)
+    # All four sources are fetched in parallel, each with its own deadline
+    related_info, related_errors = fetch_related_information(selected_ticker)
+    for message in related_errors.values():
+        st.error(message)
+
+    news_items = related_info["news"]
+    macro_data = related_info["macro"]
+    fundamentals_data = related_info["fundamentals"]
+    corporate_action_data = related_info["corporate_actions"]
 
     tabs = st.tabs(["Real-time News", "Macroeconomic Factors", "Fundamentals", "Corporate Actions"])
 
@@ -222,6 +131,7 @@ if predict_button:
     with tabs[3]:
         for k, v in corporate_action_data.items():
             st.write(f"- {k}: {v}")
+    observe("page.render", time.perf_counter() - select_started, page="page2")
 
 # --- Display source code (functions only) ---
 try:
@@ -231,9 +141,10 @@ try:
         find_related_tickers,
         display_related_stocks,
         fetch_real_time_news,
-        fetch_macro_data,
+        fetch_fred_latest,
         fetch_fundamentals,
-        fetch_corporate_actions
+        fetch_corporate_actions,
+        fetch_related_information
     ]
 
     function_texts = []
@@ -0,0 +1,87 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+import metrics
+from response_cache import response_cache
+
+
+# p95 targets in seconds per stage; stages not listed have no SLO yet
+SLO_P95_SECONDS = {
+    "page.render": 3.0,
+    "page.related_stocks": 1.0,
+    "provider.request": 2.0,
+    "features.assemble": 0.1,
+    "features.tensors": 1.0,
+    "model.load": 5.0,
+    "model.forward": 0.05,
+    "sparkline.render": 0.01,
+}
+
+
+st.title("🛠️ Performance Admin")
+st.caption("Latency of every instrumented stage in this server process since it started. "
+           "All sessions share these numbers.")
+
+series = metrics.registry.series()
+if not series:
+    st.info("No spans recorded yet. Run a prediction on the other pages first.")
+else:
+    rows = []
+    for stage, labels, summary in series:
+        slo = SLO_P95_SECONDS.get(stage)
+        rows.append({
+            "stage": stage,
+            "labels": ", ".join(f"{k}={v}" for k, v in labels.items()),
+            "count": summary["count"],
+            "errors": summary["errors"],
+            "p50 (ms)": summary["p50"] * 1000,
+            "p95 (ms)": summary["p95"] * 1000,
+            "p99 (ms)": summary["p99"] * 1000,
+            "mean (ms)": summary["mean"] * 1000,
+            "SLO p95 (ms)": slo * 1000 if slo else None,
+            "within SLO": None if slo is None else summary["p95"] <= slo,
+        })
+    table = pd.DataFrame(rows)
+
+    breaches = table[table["within SLO"] == False]  # noqa: E712
+    if breaches.empty:
+        st.success("Every stage with an SLO is within its p95 target.")
+    else:
+        st.error(f"{len(breaches)} series over their p95 target: "
+                 + ", ".join(f"{r.stage} ({r.labels})" if r.labels else r.stage for r in breaches.itertuples()))
+
+    st.header("📊 Latency by Stage")
+    st.dataframe(table, use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                for c in ["p50 (ms)", "p95 (ms)", "p99 (ms)", "mean (ms)", "SLO p95 (ms)"]})
+
+    chart = table.assign(series=table["stage"] + " " + table["labels"]).set_index("series")[["p50 (ms)", "p95 (ms)"]]
+    st.bar_chart(chart, horizontal=True)
+
+    st.header("🕒 Recent Spans")
+    recent = pd.DataFrame(metrics.registry.recent())
+    recent["time"] = recent["time"].map(lambda t: datetime.datetime.fromtimestamp(t).strftime("%H:%M:%S.%f")[:-3])
+    recent["labels"] = recent["labels"].map(lambda labels: ", ".join(f"{k}={v}" for k, v in labels.items()))
+    recent["ms"] = recent.pop("seconds") * 1000
+    st.dataframe(recent, use_container_width=True, hide_index=True, height=300)
+
+st.header("🗄️ Response Cache")
+st.json(response_cache.stats())
+
+st.header("📤 Export")
+st.caption("Set METRICS_PORT to also serve /metrics and /metrics.json for a Prometheus scraper.")
+prometheus_text = metrics.prometheus_text()
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.download_button("Prometheus text", prometheus_text, file_name="metrics.txt", mime="text/plain")
+with col2:
+    st.download_button("JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+with col3:
+    if st.button("Reset counters"):
+        metrics.registry.reset()
+        st.rerun()
+
+with st.expander("View Prometheus text"):
+    st.code(prometheus_text, language="text")
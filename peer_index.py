@@ -0,0 +1,152 @@
+"""Local sector peer index for the sp500.csv universe.
+
+    python peer_index.py        # fetch missing metadata, build and save data/peer_index.json
+
+Related tickers used to come from FMP's stock screener, one request per
+page render, and its answer could change from call to call. The index is
+built instead from sp500.csv and the sector, industry and market cap in
+ticker_metadata, and a lookup is a dict access.
+
+A ticker's peers are the largest other universe members in its industry,
+then in the rest of its sector, by market cap and then symbol, so the
+same metadata always gives the same list. A symbol outside the universe
+gets the leaders of the sector it is looked up with.
+
+The index is built offline, by this CLI and by the cache warmer after it
+refreshes the metadata, and saved to PEER_INDEX_PATH. Lookups never send
+a request: they load the saved index, or once it is older than
+PEER_INDEX_MAX_AGE_SECONDS (default a day) rebuild it from the metadata
+already stored. An empty index (no metadata stored yet) is kept for
+PEER_INDEX_RETRY_SECONDS before the next attempt.
+"""
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from ticker_metadata import get_metadata, stored_metadata
+
+
+UNIVERSE_PATH = "sp500.csv"
+PEER_INDEX_PATH = os.path.join("data", "peer_index.json")
+PEER_LIMIT = 5
+PEER_INDEX_MAX_AGE_SECONDS = int(os.environ.get("PEER_INDEX_MAX_AGE_SECONDS", 24 * 60 * 60))
+PEER_INDEX_RETRY_SECONDS = 5 * 60
+
+
+class PeerIndex:
+
+    def __init__(self, peers: dict, by_sector: dict, limit: int = PEER_LIMIT, built: float = None):
+        self.limit = limit
+        self.built = time.time() if built is None else built
+        self._peers = peers
+        self._by_sector = by_sector
+
+    @classmethod
+    def from_metadata(cls, metadata: pd.DataFrame, limit: int = PEER_LIMIT) -> "PeerIndex":
+        table = metadata.dropna(subset=["sector"]).copy()
+        table["marketCap"] = pd.to_numeric(table["marketCap"], errors="coerce").fillna(0.0)
+        table = table.rename_axis("symbol").reset_index().sort_values(["marketCap", "symbol"],
+                                                                      ascending=[False, True])
+
+        # limit + 1 leaders per group, so that dropping the ticker itself still leaves `limit`
+        by_sector = {sector: g["symbol"].head(limit + 1).tolist() for sector, g in table.groupby("sector")}
+        by_industry = {key: g["symbol"].head(limit + 1).tolist()
+                       for key, g in table.groupby(["sector", "industry"])}
+        index = cls({}, by_sector, limit)
+        for row in table.itertuples(index=False):
+            ranked = by_industry.get((row.sector, row.industry), []) + by_sector[row.sector]
+            index._peers[row.symbol] = index._pick(ranked, row.symbol)
+        return index
+
+    def _pick(self, ranked: list, symbol: str) -> list:
+        peers = []
+        for s in ranked:
+            if s != symbol and s not in peers:
+                peers.append(s)
+                if len(peers) == self.limit:
+                    break
+        return peers
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def age(self) -> float:
+        return time.time() - self.built
+
+    def peers(self, symbol: str, sector: str = None) -> list:
+        """Peers of a universe ticker, or the sector leaders for any other symbol."""
+        symbol = symbol.upper()
+        if symbol in self._peers:
+            return list(self._peers[symbol])
+        return self._pick(self._by_sector.get(sector, []), symbol)
+
+    def save(self, path: str = None):
+        path = path or PEER_INDEX_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"built": self.built, "limit": self.limit, "peers": self._peers,
+                       "by_sector": self._by_sector}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = None):
+        """The saved index, or None if there is none."""
+        try:
+            with open(path or PEER_INDEX_PATH) as f:
+                saved = json.load(f)
+            return cls(saved["peers"], saved["by_sector"], saved["limit"], saved["built"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def build_peer_index(universe_path: str = UNIVERSE_PATH, limit: int = PEER_LIMIT,
+                     fetch: bool = False) -> PeerIndex:
+    """Index of the universe from the stored metadata; with fetch, missing metadata is fetched first."""
+    tickers = pd.read_csv(universe_path)["ticker"].dropna().tolist()
+    metadata = get_metadata(tickers) if fetch else stored_metadata(tickers)
+    return PeerIndex.from_metadata(metadata, limit)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _expired(index: PeerIndex) -> bool:
+    return index.age() > (PEER_INDEX_MAX_AGE_SECONDS if len(index) else PEER_INDEX_RETRY_SECONDS)
+
+
+def get_peer_index(rebuild: bool = False) -> PeerIndex:
+    """Process-wide PeerIndex: the saved one, or rebuilt from stored metadata once it has expired.
+
+    With rebuild, the index is rebuilt from the stored metadata and saved
+    whatever its age. Neither path sends a request.
+    """
+    global _index
+    with _lock:
+        if not rebuild and _index is not None and not _expired(_index):
+            return _index
+        index = None if rebuild else PeerIndex.load()
+        if index is None or _expired(index):
+            index = build_peer_index()
+            if len(index):
+                index.save()
+        _index = index
+        return _index
+
+
+def find_peers(symbol: str, sector: str = None) -> list:
+    return get_peer_index().peers(symbol, sector)
+
+
+if __name__ == "__main__":
+    from replay import install_from_env
+    install_from_env()
+    index = build_peer_index(fetch=True)
+    if not len(index):
+        raise SystemExit("No metadata for the universe; is FMP reachable?")
+    index.save()
+    print(f"Wrote {PEER_INDEX_PATH}: peers for {len(index)} tickers")
@@ -0,0 +1,226 @@
+"""Local prediction service with micro-batching.
+
+    python prediction_service.py --port 8765 --max-batch 64 --max-wait-ms 5
+
+Owns one copy of each LSTMVolumePredictor (through the model registry)
+for every Streamlit session. Concurrent requests for the same model are
+queued, and a worker per model stacks whatever arrives within
+--max-wait-ms (up to --max-batch requests) into one forward pass.
+
+    POST /predict  {"model": "volatility", "features": [[...], ...]}
+                   -> {"model": ..., "version": ..., "prediction": float}
+                   400 unless features is one (time_steps, input_size) window
+    GET  /health   -> {"status": "ok", "models": [...]}
+    GET  /stats    -> per-model request and batch counters
+
+The server binds to 127.0.0.1 only.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Seconds a request handler waits for its batch before giving up
+RESULT_TIMEOUT = 30.0
+
+
+class MicroBatcher:
+    """Collects single-window requests for one model into batched forward passes."""
+
+    def __init__(self, registry, name: str, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.registry = registry
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, X: np.ndarray) -> Future:
+        """Queue one (time_steps, features) window; raises ValueError for any other shape."""
+        X = np.asarray(X, dtype=np.float32)
+        input_size = self.registry.input_size(self.name)
+        if X.ndim != 2 or X.shape[1] != input_size:
+            raise ValueError(f"Model '{self.name}' expects one (time_steps, {input_size}) window, "
+                             f"got shape {X.shape}")
+        future = Future()
+        self._queue.put((X, future))
+        return future
+
+    def _collect(self) -> list:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            # Windows of different lengths cannot share a batch
+            by_shape = {}
+            for X, future in items:
+                by_shape.setdefault(X.shape, []).append((X, future))
+            for group in by_shape.values():
+                try:
+                    out = self.registry.predict(self.name, np.stack([X for X, _ in group]))
+                except Exception as e:
+                    for _, future in group:
+                        future.set_exception(e)
+                    continue
+                if len(out) != len(group):
+                    error = RuntimeError(f"Batch of {len(group)} windows gave {len(out)} predictions")
+                    for _, future in group:
+                        future.set_exception(error)
+                    continue
+                for (_, future), y in zip(group, out[:, 0]):
+                    future.set_result(float(y))
+                self.batches += 1
+            self.requests += len(items)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
+
+
+class PredictionService:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        # Imported here so PredictionClient users do not pay for torch
+        from model_registry import get_registry
+        self.registry = get_registry()
+        self.batchers = {
+            name: MicroBatcher(self.registry, name, max_batch, max_wait_ms)
+            for name in self.registry.names()
+        }
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _reply(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, {"status": "ok", "models": service.registry.names()})
+                elif self.path == "/stats":
+                    self._reply(200, {name: b.stats() for name, b in service.batchers.items()})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/predict":
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    name = request["model"]
+                    batcher = service.batchers[name]
+                    future = batcher.submit(request["features"])
+                except KeyError as e:
+                    self._reply(400, {"error": f"missing or unknown {e}"})
+                    return
+                except Exception as e:
+                    self._reply(400, {"error": str(e)})
+                    return
+                try:
+                    prediction = future.result(timeout=RESULT_TIMEOUT)
+                except FutureTimeout:
+                    self._reply(504, {"error": f"no prediction within {RESULT_TIMEOUT:.0f}s"})
+                    return
+                except Exception as e:
+                    self._reply(500, {"error": str(e)})
+                    return
+                self._reply(200, {
+                    "model": name,
+                    "version": service.registry.version(name),
+                    "prediction": prediction,
+                })
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="prediction-service", daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PredictionClient:
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def predict(self, name: str, X) -> float:
+        """Prediction for one (time_steps, features) window."""
+        response = self.session.post(
+            f"{self.url}/predict",
+            json={"model": name, "features": np.asarray(X, dtype=np.float32).tolist()},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["prediction"]
+
+    def stats(self) -> dict:
+        return self.session.get(f"{self.url}/stats", timeout=self.timeout).json()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    service = PredictionService(port=args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    print(f"Serving {', '.join(service.registry.names())} on {service.url}")
+    service.serve_forever()
@@ -0,0 +1,50 @@
+import datetime
+import json
+import os
+
+import pandas as pd
+
+
+PREDICTIONS_DIR = "predictions"
+LATEST_FILE = "latest.json"
+
+TABLE_COLUMNS = [
+    "ticker", "as_of", "predicted_volatility", "predicted_volume",
+    "volatility_model_version", "volume_model_version", "generated_at"
+]
+
+
+def write_table(table: pd.DataFrame, versions: dict, directory: str = PREDICTIONS_DIR) -> str:
+    """Write a versioned prediction table and point latest.json at it."""
+    os.makedirs(directory, exist_ok=True)
+    run_date = datetime.date.today().strftime("%Y%m%d")
+    filename = f"predictions_{run_date}_{versions['volatility']}_{versions['volume']}.csv"
+    path = os.path.join(directory, filename)
+    table[TABLE_COLUMNS].to_csv(path, index=False)
+
+    # Swap the pointer atomically so readers never see a half-written manifest
+    manifest = {"file": filename, "versions": versions, "rows": len(table)}
+    tmp_path = os.path.join(directory, LATEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, LATEST_FILE))
+    return path
+
+
+def load_latest_table(directory: str = PREDICTIONS_DIR) -> pd.DataFrame:
+    """Latest prediction table indexed by ticker, or an empty frame if none exists."""
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            manifest = json.load(f)
+        table = pd.read_csv(os.path.join(directory, manifest["file"]))
+    except (OSError, ValueError, KeyError):
+        return pd.DataFrame(columns=TABLE_COLUMNS).set_index("ticker")
+    return table.set_index("ticker")
+
+
+def lookup(table: pd.DataFrame, ticker: str):
+    """Row for ticker as a dict, or None."""
+    ticker = ticker.upper()
+    if ticker not in table.index:
+        return None
+    return table.loc[ticker].to_dict()
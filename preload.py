@@ -0,0 +1,46 @@
+"""Background import of the heavy dependencies.
+
+Pages import torch and yfinance lazily, only on the paths that need them.
+streamlit_app.py calls start_preload() once per process so that, in the
+common case, those imports have already finished in this thread by the
+time a user first clicks Predict. Python's import lock makes a page that
+gets there first simply wait for the import in progress instead of
+importing twice.
+
+    PRELOAD=0          disable the background imports
+    PRELOAD_MODELS=1   also load and warm up the models (costs their memory up front)
+"""
+import importlib
+import os
+import threading
+import time
+
+from metrics import observe
+
+
+# In the order pages need them: the Streamlit pages, then Yahoo, then the models
+HEAVY_MODULES = ("pandas", "numpy", "yfinance", "torch", "model_registry")
+
+PRELOAD = os.environ.get("PRELOAD", "1") != "0"
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+
+
+def _preload(modules, load_models: bool):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        observe("preload.import", time.perf_counter() - start, module=name)
+    if load_models:
+        from model_registry import get_registry
+        start = time.perf_counter()
+        get_registry()
+        observe("preload.models", time.perf_counter() - start)
+
+
+def start_preload(modules=HEAVY_MODULES, load_models: bool = PRELOAD_MODELS) -> threading.Thread:
+    thread = threading.Thread(target=_preload, args=(modules, load_models), name="preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,228 @@
+"""Local OHLCV store backing the yfinance calls.
+
+Each (ticker, interval) lives in data/prices/<interval>/<TICKER>.pkl and
+keeps its full history. A read only goes to Yahoo for the bars after the
+last stored one, and not at all if the file was refreshed recently.
+
+A first read downloads only the days it asked for; the deep history
+(BACKFILL_DAYS) is fetched by callers that pass backfill=True, which are
+the cache warmer and the batch CLIs, never the page request path.
+"""
+import datetime
+import os
+import threading
+import time
+
+import pandas as pd
+
+from http_client import gate_request
+from metrics import span
+
+
+STORE_DIR = os.path.join("data", "prices")
+
+# How much history backfill=True reads reach back for.
+# Yahoo only serves about two years of hourly bars.
+BACKFILL_DAYS = {"1d": 5 * 365, "1h": 729}
+
+# Stored bars starting this close to the wanted start reach it (weekends, holidays)
+COVERAGE_SLACK_DAYS = 7
+
+# A file younger than this is served without asking Yahoo for new bars
+MIN_REFRESH_SECONDS = {"1d": 15 * 60, "1h": 5 * 60}
+
+
+def yf_download(*args, **kwargs) -> pd.DataFrame:
+    # yfinance is only imported once a download is actually needed
+    import yfinance as yf
+    return yf.download(*args, **kwargs)
+
+
+# Swappable for recorded fixtures, see set_downloader()
+_downloader = yf_download
+
+
+def set_downloader(downloader):
+    global _downloader
+    _downloader = downloader
+
+
+def download(tickers, *args, **kwargs) -> pd.DataFrame:
+    # yf.download sends one request per ticker
+    gate_request("yahoo", 1 if isinstance(tickers, str) else len(tickers))
+    with span("provider.request", provider="yahoo", endpoint="download"):
+        return _downloader(tickers, *args, **kwargs)
+
+
+def ohlcv_for(download: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Single-ticker OHLCV frame with flat columns from any yf.download result."""
+    if isinstance(download.columns, pd.MultiIndex):
+        if ticker in download.columns.get_level_values(0):
+            download = download[ticker]
+        else:
+            download = download.xs(ticker, axis=1, level=1)
+    return download.dropna(how="all")
+
+
+class PriceStore:
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # (ticker, interval) -> earliest start already asked of Yahoo, so a
+        # ticker with less history than wanted is not re-downloaded on every read
+        self._requested = {}
+
+    # ----------------------- files -----------------------
+    def _path(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, interval, f"{ticker.upper()}.pkl")
+
+    def _lock(self, ticker: str, interval: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def _read(self, ticker: str, interval: str):
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        return pd.read_pickle(path)
+
+    def _write(self, ticker: str, interval: str, df: pd.DataFrame):
+        path = self._path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _touch(self, ticker: str, interval: str):
+        os.utime(self._path(ticker, interval))
+
+    def _is_fresh(self, ticker: str, interval: str) -> bool:
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return False
+        return time.time() - os.path.getmtime(path) < MIN_REFRESH_SECONDS.get(interval, 15 * 60)
+
+    # ----------------------- merging -----------------------
+    @staticmethod
+    def _merge(stored, new: pd.DataFrame) -> pd.DataFrame:
+        if stored is None or stored.empty:
+            return new.sort_index()
+        if new is None or new.empty:
+            return stored
+        # The last stored bar may have been partial, so the new copy wins
+        merged = pd.concat([stored, new])
+        return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+    def _save(self, ticker: str, interval: str, stored, new):
+        merged = self._merge(stored, new)
+        if merged is None or merged.empty:
+            return merged
+        if merged is stored:
+            self._touch(ticker, interval)
+        else:
+            self._write(ticker, interval, merged)
+        return merged
+
+    def _download_start(self, ticker: str, interval: str, stored, days: int, backfill: bool):
+        """Start date of the download a read needs, or None when the stored bars will do.
+
+        Reaches back to the read's start when the store does not go back that
+        far, otherwise tops up from the last stored bar once the file is stale.
+        """
+        depth = max(days, BACKFILL_DAYS[interval]) if backfill else days
+        wanted = datetime.date.today() - datetime.timedelta(days=depth)
+        key = (ticker.upper(), interval)
+        requested = self._requested.get(key)
+        covered = stored is not None and not stored.empty and (
+            stored.index[0].date() <= wanted + datetime.timedelta(days=COVERAGE_SLACK_DAYS)
+            or (requested is not None and requested <= wanted))
+        if not covered:
+            return wanted
+        if not self._is_fresh(ticker, interval):
+            return stored.index[-1].date()
+        return None
+
+    def _downloaded_from(self, ticker: str, interval: str, start):
+        key = (ticker.upper(), interval)
+        self._requested[key] = min(self._requested.get(key, start), start)
+
+    # ----------------------- reads -----------------------
+    def history(self, ticker: str, interval: str = "1d", days: int = 60, backfill: bool = False) -> pd.DataFrame:
+        """Bars from the last `days` calendar days, downloading only what the store lacks.
+
+        backfill=True also fills BACKFILL_DAYS of history; it is meant for
+        background jobs, not for page reads.
+        """
+        with self._lock(ticker, interval):
+            stored = self._read(ticker, interval)
+            start = self._download_start(ticker, interval, stored, days, backfill)
+            if start is not None:
+                try:
+                    new = download(ticker, start=start, interval=interval, progress=False)
+                    stored = self._save(ticker, interval, stored, ohlcv_for(new, ticker))
+                    self._downloaded_from(ticker, interval, start)
+                except Exception:
+                    # Serve what we have if Yahoo is unavailable
+                    if stored is None:
+                        raise
+        return _last_days(stored, days)
+
+    def stored(self, ticker: str, interval: str = "1d") -> pd.DataFrame:
+        """Everything stored for the ticker, without asking Yahoo; None if nothing is."""
+        with self._lock(ticker, interval):
+            return self._read(ticker, interval)
+
+    def history_many(self, tickers: list, interval: str = "1d", days: int = 60,
+                     backfill: bool = False) -> dict:
+        """Like history() for many tickers, with one yf.download per group of tickers to top up."""
+        stored = {t: self._read(t, interval) for t in tickers}
+        starts = {t: self._download_start(t, interval, stored[t], days, backfill) for t in tickers}
+
+        # Tickers short of history share the same wanted start; tails start at the earliest last bar
+        short = [t for t in tickers if starts[t] is not None and (stored[t] is None or stored[t].empty
+                                                                  or starts[t] < stored[t].index[-1].date())]
+        tail = [t for t in tickers if starts[t] is not None and t not in short]
+
+        downloads = []
+        if short:
+            downloads.append((short, min(starts[t] for t in short)))
+        if tail:
+            downloads.append((tail, min(starts[t] for t in tail)))
+
+        for group, start in downloads:
+            try:
+                new = download(group, start=start, interval=interval, group_by="ticker", threads=True,
+                               progress=False)
+            except Exception:
+                continue
+            for t in group:
+                try:
+                    frame = ohlcv_for(new, t)
+                except KeyError:
+                    continue
+                with self._lock(t, interval):
+                    stored[t] = self._save(t, interval, self._read(t, interval), frame)
+                self._downloaded_from(t, interval, start)
+
+        return {t: _last_days(stored[t], days) for t in tickers if stored[t] is not None}
+
+
+def _last_days(df: pd.DataFrame, days: int) -> pd.DataFrame:
+    if df is None or df.empty:
+        return df
+    cutoff = df.index[-1] - datetime.timedelta(days=days)
+    return df[df.index > cutoff]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+    return _store
@@ -0,0 +1,195 @@
+import datetime
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from http_client import get_json, prime_cache
+from macro_store import get_macro_store
+
+
+# FMP accepts a comma-separated symbol list on the profile endpoint
+PROFILE_BATCH_SIZE = 100
+
+
+def fetch_profile(symbol: str):
+    """Raw FMP profile for one symbol, or None if FMP has no data."""
+    data = get_json("fmp", f"/profile/{symbol}")
+    if isinstance(data, list) and len(data) > 0:
+        return data[0]
+    return None
+
+
+def company_info_from_profile(profile: dict) -> dict:
+    return {
+        'Name': profile.get('companyName', 'N/A'),
+        'Sector': profile.get('sector', 'N/A'),
+        'Website': profile.get('website', 'N/A'),
+        'Image': profile.get('image', 'N/A')
+    }
+
+
+def company_metrics_from_profile(profile: dict) -> dict:
+    if not profile:
+        return {key: 0.0 for key in [
+            "divyield", "beta", "marketCap", "averageVolume", "price"
+        ]}
+    return {
+        "divyield": profile.get("lastDividend", 0.0),
+        "beta": profile.get("beta", 0.0),
+        "marketCap": profile.get("marketCap", 0.0),
+        "averageVolume": profile.get("averageVolume", 0.0),
+        "price": profile.get("price", 0.0)
+    }
+
+
+def fetch_profiles(symbols: list) -> dict:
+    """FMP company profiles for many symbols, keyed by symbol."""
+    profiles = {}
+    for start in range(0, len(symbols), PROFILE_BATCH_SIZE):
+        chunk = symbols[start:start + PROFILE_BATCH_SIZE]
+        data = get_json("fmp", f"/profile/{','.join(chunk)}")
+        if isinstance(data, list):
+            for item in data:
+                profiles[item["symbol"].upper()] = item
+                # Later single-symbol lookups are served from the cache
+                prime_cache("fmp", f"/profile/{item['symbol']}", [item])
+    return profiles
+
+
+# --- Related Information sources ---
+def fetch_real_time_news(ticker: str) -> list:
+    today = datetime.date.today()
+    seven_days_ago = today - datetime.timedelta(days=7)
+    data = get_json("finnhub", "/company-news", {
+        "symbol": ticker, "from": seven_days_ago.strftime("%Y-%m-%d"), "to": today.strftime("%Y-%m-%d")
+    })
+    if len(data) == 0:
+        return [("No recent news found.", None)]
+    return [(article['headline'], article['url']) for article in data[:3]]
+
+
+def fetch_fred_latest(series_id: str) -> str:
+    obs = get_json("fred", "/series/observations", {"series_id": series_id}).get("observations", [])
+    if obs:
+        return obs[-1]["value"]
+    return "N/A"
+
+
+def fetch_fundamentals(ticker: str) -> dict:
+    data = get_json("fmp", f"/key-metrics/{ticker}", {"limit": 1})
+    if not (isinstance(data, list) and len(data) > 0):
+        return {"ROA": "N/A", "ROE": "N/A", "Dividend Yield": "N/A"}
+
+    fundamentals = data[0]
+    return {
+        "ROA": f"{float(fundamentals.get('returnOnTangibleAssets', 0)) * 100:.2f}%" if fundamentals.get('returnOnTangibleAssets') is not None else "N/A",
+        "ROE": f"{float(fundamentals.get('roe', 0)) * 100:.2f}%" if fundamentals.get('roe') is not None else "N/A",
+        "Dividend Yield": fundamentals.get('dividendYield', 'N/A')
+    }
+
+
+def fetch_corporate_actions(ticker: str) -> dict:
+    data = get_json("alphavantage", "/query", {"function": "DIVIDENDS", "symbol": ticker}).get('data', [])
+    if data:
+        # The API returns the most recent dividend first
+        latest_dividend = data[0]
+        dividend_amount = latest_dividend.get('amount', latest_dividend.get('dividend', "0.0"))
+    else:
+        dividend_amount = "0.0"
+    return {
+        "Dividend Amount": f"${dividend_amount}",
+        "Share Buyback": random.choice(["Ongoing", "None announced"])  # Still mock buyback info
+    }
+
+
+# --- Concurrent fan-out for the Related Information tabs ---
+MACRO_SERIES = {
+    "GDP (Billion Dollars)": "GDP",
+    "CPI Inflation Rate": "CPIAUCSL",
+    "Unemployment Rate": "UNRATE",
+}
+
+# Seconds each source may take before the tabs render without it
+SOURCE_DEADLINES = {"news": 4.0, "macro": 5.0, "fundamentals": 5.0, "corporate_actions": 6.0}
+
+# Shown in a tab when its source failed or missed its deadline
+PLACEHOLDERS = {
+    "news": [("News is unavailable right now.", None)],
+    "macro": {},
+    "fundamentals": {"ROA": "N/A", "ROE": "N/A", "Dividend Yield": "N/A"},
+    "corporate_actions": {},
+}
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="providers")
+
+# Warm the cache for the ticker highlighted in the selectbox (off by default)
+PREFETCH_ON_SELECT = os.environ.get("PREFETCH_ON_SELECT", "0") == "1"
+
+
+def prefetch_company(symbol: str):
+    """Fetch symbol's profile in the background so it is cached (peers are local, see peer_index.py)."""
+    return _executor.submit(fetch_profile, symbol)
+
+
+def _result(future, deadline: float):
+    return future.result(timeout=max(0.0, deadline - time.monotonic()))
+
+
+def _stored_or_live(store, series_id: str) -> str:
+    value = store.latest(series_id)
+    return fetch_fred_latest(series_id) if value is None else f"{value:g}"
+
+
+def fetch_related_information(ticker: str, deadlines: dict = None):
+    """News, macro, fundamentals and corporate actions fetched concurrently.
+
+    Returns (results, errors): results has an entry for every source, using
+    PLACEHOLDERS for any source that failed or ran past its deadline, and
+    errors maps those sources to a message.
+    """
+    deadlines = {**SOURCE_DEADLINES, **(deadlines or {})}
+    start = time.monotonic()
+
+    futures = {
+        "news": _executor.submit(fetch_real_time_news, ticker),
+        "fundamentals": _executor.submit(fetch_fundamentals, ticker),
+        "corporate_actions": _executor.submit(fetch_corporate_actions, ticker),
+    }
+    # Macro values come from the local store; FRED is only called for a
+    # series the store has not fetched yet
+    store = get_macro_store()
+    macro_futures = {
+        label: _executor.submit(_stored_or_live, store, series_id)
+        for label, series_id in MACRO_SERIES.items()
+    }
+
+    results, errors = {}, {}
+    for source, future in futures.items():
+        try:
+            results[source] = _result(future, start + deadlines[source])
+        except FuturesTimeoutError:
+            errors[source] = f"{source} timed out after {deadlines[source]:.0f}s"
+        except Exception as e:
+            errors[source] = f"Error fetching {source}: {e}"
+
+    # A slow FRED series only blanks its own line
+    macro = {}
+    for label, future in macro_futures.items():
+        try:
+            macro[label] = _result(future, start + deadlines["macro"])
+        except FuturesTimeoutError:
+            macro[label] = "N/A"
+            errors["macro"] = f"macro timed out after {deadlines['macro']:.0f}s"
+        except Exception as e:
+            macro[label] = "N/A"
+            errors["macro"] = f"Error fetching macro: {e}"
+    if any(value != "N/A" for value in macro.values()):
+        for label in ("CPI Inflation Rate", "Unemployment Rate"):
+            if macro[label] != "N/A":
+                macro[label] = f"{macro[label]}%"
+        results["macro"] = macro
+
+    for source, placeholder in PLACEHOLDERS.items():
+        results.setdefault(source, placeholder)
+    return results, errors
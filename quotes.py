@@ -0,0 +1,34 @@
+from price_store import get_price_store
+from ticker_metadata import get_short_names
+
+
+def fetch_related_quotes(symbols: list, interval: str = "1d", days: int = 7) -> list:
+    """Latest price, change and price trend for every symbol from one batched read.
+
+    Symbols with fewer than two bars are left out.
+    """
+    if not symbols:
+        return []
+    histories = get_price_store().history_many(symbols, interval=interval, days=days)
+    names = get_short_names(symbols)
+
+    quotes = []
+    for sym in symbols:
+        hist = histories.get(sym)
+        if hist is None or hist.empty or len(hist) < 2:
+            continue
+        closes = hist["Close"].dropna()
+        if len(closes) < 2:
+            continue
+
+        price_today = closes.iloc[-1]
+        price_yesterday = closes.iloc[-2]
+        quotes.append({
+            "symbol": sym,
+            "name": names.get(sym.upper(), sym),
+            "price": price_today,
+            "change_pct": ((price_today - price_yesterday) / price_yesterday) * 100,
+            "price_trend": closes.values,
+            "last_bar": closes.index[-1],
+        })
+    return quotes
@@ -0,0 +1,270 @@
+"""Record/replay layer under http_client and the price store's yf.download.
+
+    DATA_PROVIDER_MODE=record streamlit run streamlit_app.py   # use the app, capture every response
+    DATA_PROVIDER_MODE=replay streamlit run streamlit_app.py   # same flows, no network
+
+Cassettes live under CASSETTE_DIR (default cassettes/):
+    http/<provider>/<key>.json      one response per request, with the request alongside
+    prices/<interval>/<TICKER>.pkl  every bar recorded for the ticker
+
+The key ignores the API key and day-dependent params (news date range,
+FRED observation_start), so a cassette keeps replaying on later days.
+Price downloads are stored per ticker and merged across recordings; in
+replay a download is answered with the window it asked for.
+
+Replay can be made to look like a real network:
+    REPLAY_LATENCY_MS   "150" for every provider, or "fmp=120,yahoo=400,*=80"
+    REPLAY_ERROR_RATE   same format, fraction of calls that fail
+    REPLAY_SEED         seed for the latency jitter and injected errors
+
+A request with no cassette raises CassetteMiss unless a fallback was
+given to install() (the benchmarks use synthetic responses).
+
+Pages go through streamlit_app.py, which calls install_from_env(); CLIs
+that should honour DATA_PROVIDER_MODE call it themselves.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+import requests
+
+import http_client
+import price_store
+
+
+MODES = ("live", "record", "replay")
+DATA_PROVIDER_MODE = os.environ.get("DATA_PROVIDER_MODE", "live")
+CASSETTE_DIR = os.environ.get("CASSETTE_DIR", "cassettes")
+
+# Params that change from day to day and should not select a cassette
+VOLATILE_PARAMS = ("from", "to", "observation_start")
+
+# yf.download period strings -> calendar days
+PERIOD_DAYS = {"1d": 1, "5d": 5, "7d": 7, "1mo": 31, "60d": 60, "3mo": 92, "6mo": 183,
+               "1y": 365, "2y": 730, "730d": 730, "5y": 5 * 365, "10y": 10 * 365}
+
+
+class CassetteMiss(KeyError):
+    pass
+
+
+class InjectedError(requests.exceptions.ConnectionError):
+    """Raised in replay in place of a response, at REPLAY_ERROR_RATE."""
+
+
+def request_key(provider: str, path: str, params: dict = None) -> str:
+    params = {k: v for k, v in (params or {}).items() if k not in VOLATILE_PARAMS}
+    raw = json.dumps([provider, path, sorted(params.items())], default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def parse_per_provider(value, default: float = 0.0) -> dict:
+    """"150" -> {"*": 150.0}; "fmp=120,*=80" -> {"fmp": 120.0, "*": 80.0}."""
+    if value in (None, ""):
+        return {"*": default}
+    if isinstance(value, (int, float)):
+        return {"*": float(value)}
+    if isinstance(value, dict):
+        return {"*": default, **{k: float(v) for k, v in value.items()}}
+    out = {"*": default}
+    for part in str(value).split(","):
+        name, _, number = part.rpartition("=")
+        out[name.strip() or "*"] = float(number)
+    return out
+
+
+class CassetteStore:
+
+    def __init__(self, root: str = CASSETTE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _http_path(self, provider: str, path: str, params: dict = None) -> str:
+        return os.path.join(self.root, "http", provider, f"{request_key(provider, path, params)}.json")
+
+    def _prices_path(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, "prices", interval, f"{ticker.upper()}.pkl")
+
+    @staticmethod
+    def _replace(path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def read_response(self, provider: str, path: str, params: dict = None):
+        cassette = self._http_path(provider, path, params)
+        if not os.path.exists(cassette):
+            raise CassetteMiss(f"No cassette for {provider} {path} {params or {}}")
+        with open(cassette) as f:
+            return json.load(f)["response"]
+
+    def write_response(self, provider: str, path: str, params: dict, response):
+        record = {"provider": provider, "path": path, "params": params, "response": response}
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+        self._replace(self._http_path(provider, path, params), write)
+
+    def read_prices(self, ticker: str, interval: str) -> pd.DataFrame:
+        cassette = self._prices_path(ticker, interval)
+        if not os.path.exists(cassette):
+            raise CassetteMiss(f"No cassette for {ticker} {interval} prices")
+        return pd.read_pickle(cassette)
+
+    def write_prices(self, ticker: str, interval: str, df: pd.DataFrame):
+        if df is None or df.empty:
+            return
+        with self._lock:
+            try:
+                stored = self.read_prices(ticker, interval)
+            except CassetteMiss:
+                stored = None
+            merged = price_store.PriceStore._merge(stored, df)
+            self._replace(self._prices_path(ticker, interval), merged.to_pickle)
+
+
+def _window(df: pd.DataFrame, period: str = None, start=None, end=None) -> pd.DataFrame:
+    if start is not None:
+        start = pd.Timestamp(start)
+        if df.index.tz is not None and start.tz is None:
+            start = start.tz_localize(df.index.tz)
+        df = df[df.index >= start]
+    elif period is not None and not df.empty:
+        df = df[df.index > df.index[-1] - pd.Timedelta(days=PERIOD_DAYS.get(period, 365))]
+    if end is not None:
+        end = pd.Timestamp(end)
+        if df.index.tz is not None and end.tz is None:
+            end = end.tz_localize(df.index.tz)
+        df = df[df.index < end]
+    return df
+
+
+class Recorder:
+    """Live calls, with every response also written to the store."""
+
+    def __init__(self, store: CassetteStore, downloader=None):
+        self.store = store
+        self.downloader = downloader or price_store.yf_download
+
+    def transport(self, provider: str, path: str, params: dict = None):
+        response = http_client.fetch_live(provider, path, params or {})
+        self.store.write_response(provider, path, params, response)
+        return response
+
+    def download(self, tickers, *args, **kwargs) -> pd.DataFrame:
+        result = self.downloader(tickers, *args, **kwargs)
+        interval = kwargs.get("interval", "1d")
+        for ticker in ([tickers] if isinstance(tickers, str) else tickers):
+            try:
+                self.store.write_prices(ticker, interval, price_store.ohlcv_for(result, ticker))
+            except KeyError:
+                continue
+        return result
+
+
+class Replayer:
+    """Answers from the store, with injected latency and errors.
+
+    http_fallback(provider, path, params) and prices_fallback(ticker, interval)
+    are used for requests with no cassette instead of raising CassetteMiss.
+    """
+
+    def __init__(self, store: CassetteStore, latency_ms=None, error_rate=None, seed: int = None,
+                 http_fallback=None, prices_fallback=None):
+        self.store = store
+        self.latency_ms = parse_per_provider(latency_ms)
+        self.error_rate = parse_per_provider(error_rate)
+        self.http_fallback = http_fallback
+        self.prices_fallback = prices_fallback
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _setting(self, settings: dict, provider: str) -> float:
+        return settings.get(provider, settings["*"])
+
+    def _simulate_network(self, provider: str, what: str):
+        with self._rng_lock:
+            jitter = self._rng.uniform(0.5, 1.5)
+            fail = self._rng.random() < self._setting(self.error_rate, provider)
+        latency = self._setting(self.latency_ms, provider) / 1000.0 * jitter
+        if latency > 0:
+            time.sleep(latency)
+        if fail:
+            raise InjectedError(f"Injected {provider} error for {what}")
+
+    def transport(self, provider: str, path: str, params: dict = None):
+        self._simulate_network(provider, path)
+        try:
+            return self.store.read_response(provider, path, params)
+        except CassetteMiss:
+            if self.http_fallback is None:
+                raise
+            return self.http_fallback(provider, path, params)
+
+    def _history(self, ticker: str, interval: str) -> pd.DataFrame:
+        try:
+            return self.store.read_prices(ticker, interval)
+        except CassetteMiss:
+            if self.prices_fallback is None:
+                raise
+            return self.prices_fallback(ticker, interval)
+
+    def download(self, tickers, period: str = None, interval: str = "1d", start=None, end=None,
+                 **kwargs) -> pd.DataFrame:
+        """yf.download stand-in: flat columns for one ticker, (ticker, field) columns for a list."""
+        self._simulate_network("yahoo", f"download {tickers}")
+        if isinstance(tickers, str):
+            return _window(self._history(tickers, interval), period, start, end)
+        frames = {}
+        for ticker in tickers:
+            try:
+                frames[ticker] = _window(self._history(ticker, interval), period, start, end)
+            except CassetteMiss:
+                continue    # yf.download leaves unknown tickers out as well
+        if not frames:
+            raise CassetteMiss(f"No cassette for any of {tickers} {interval} prices")
+        return pd.concat(frames, axis=1)
+
+
+_active = None
+
+
+def install(mode: str, root: str = CASSETTE_DIR, **replay_options):
+    """Put the record or replay layer under every provider call; "live" removes it."""
+    global _active
+    if mode not in MODES:
+        raise ValueError(f"DATA_PROVIDER_MODE must be one of {MODES}, got {mode!r}")
+    if mode == "live":
+        http_client.set_transport(None)
+        price_store.set_downloader(price_store.yf_download)
+        _active = None
+        return None
+    store = CassetteStore(root)
+    layer = Recorder(store) if mode == "record" else Replayer(store, **replay_options)
+    http_client.set_transport(layer.transport)
+    price_store.set_downloader(layer.download)
+    _active = layer
+    return layer
+
+
+def install_from_env():
+    """install() configured by DATA_PROVIDER_MODE, CASSETTE_DIR and the REPLAY_* variables."""
+    if DATA_PROVIDER_MODE == "replay":
+        seed = os.environ.get("REPLAY_SEED")
+        return install("replay", CASSETTE_DIR,
+                       latency_ms=os.environ.get("REPLAY_LATENCY_MS"),
+                       error_rate=os.environ.get("REPLAY_ERROR_RATE"),
+                       seed=int(seed) if seed else None)
+    return install(DATA_PROVIDER_MODE, CASSETTE_DIR)
+
+
+def active():
+    """The installed Recorder or Replayer, or None when live."""
+    return _active
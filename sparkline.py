@@ -0,0 +1,55 @@
+"""Inline SVG sparklines for the related-stock cards.
+
+Replaces a matplotlib figure per card. The SVG is a single polyline built
+with numpy and memoized on (symbol, last bar, color, size), so a rerun
+with no new bar reuses the same string and nothing accumulates in the
+process.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import timed
+
+
+MAX_CACHED = 1024
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+@timed("sparkline.render")
+def render_svg(prices, color: str, width: int = 250, height: int = 120, line_width: float = 2) -> str:
+    y = np.asarray(prices, dtype=np.float64)
+    y = y[~np.isnan(y)]
+    if len(y) < 2:
+        return f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"></svg>'
+
+    pad = line_width
+    x = np.linspace(pad, width - pad, len(y))
+    span = y.max() - y.min()
+    y = (height - pad) - (y - y.min()) / (span if span else 1.0) * (height - 2 * pad)
+    points = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(x, y))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<polyline fill="none" stroke="{color}" stroke-width="{line_width}" '
+        f'stroke-linejoin="round" stroke-linecap="round" points="{points}"/></svg>'
+    )
+
+
+def sparkline_svg(symbol: str, last_bar, prices, color: str, width: int = 250, height: int = 120) -> str:
+    """Memoized render_svg; a new bar for the symbol gives a new key."""
+    key = (symbol, str(last_bar), color, width, height)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    svg = render_svg(prices, color, width, height)
+    with _lock:
+        _cache[key] = svg
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return svg
@@ -1,5 +1,44 @@
+import os
+
 import streamlit as st
 
+from cache_warmer import start_cache_warmer
+from metrics import METRICS_PORT, start_metrics_server
+from preload import PRELOAD, start_preload
+from replay import install_from_env
+
+
+# **** Import torch / yfinance in the background (PRELOAD=0 to disable) ****
+@st.cache_resource
+def preload():
+    return start_preload()
+
+if PRELOAD:
+    preload()
+
+# **** Live, record or replay provider data (DATA_PROVIDER_MODE, see replay.py) ****
+@st.cache_resource
+def provider_layer():
+    return install_from_env()
+
+provider_layer()
+
+# **** Background cache warming (once per process, CACHE_WARMER=0 to disable) ****
+@st.cache_resource
+def cache_warmer():
+    return start_cache_warmer()
+
+if os.environ.get("CACHE_WARMER", "1") != "0":
+    cache_warmer()
+
+# **** Prometheus /metrics endpoint (only when METRICS_PORT is set) ****
+@st.cache_resource
+def metrics_server():
+    return start_metrics_server(METRICS_PORT)
+
+if METRICS_PORT:
+    metrics_server()
+
 # **** Page layout setup ****
 App_page_0 = st.Page(
     "page0.py",
@@ -21,6 +60,10 @@ App_page_5 = st.Page(
     "page-1.py",
     title="See Our Reference"
 )
+App_page_3 = st.Page(
+    "page3.py",
+    title="Performance Admin"
+)
 
 # **** Set up navigation with invisible section headers ****
 pg = st.navigation(
@@ -28,6 +71,7 @@ pg = st.navigation(
         "  ": [App_page_0],   # 上面第一个空白标题
         "Check Your Stock": [App_page_1, App_page_2, App_page_4],
         "       ": [App_page_5],  # 下面第二个空白标题（两个零宽空格，避免冲突）
+        "Admin": [App_page_3],
     }
 )
 
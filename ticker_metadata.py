@@ -0,0 +1,101 @@
+"""Local table of per-ticker metadata (display names, sector, industry, size).
+
+Names used to come from yf.Ticker(sym).info, which is one slow request
+per symbol. They are now read from data/ticker_metadata.csv and only the
+symbols missing from it are looked up, in a single FMP profile call.
+peer_index.py builds the sector peer lists from the same table, offline
+(stored_metadata() never fetches).
+"""
+import os
+import threading
+
+import pandas as pd
+
+from providers import fetch_profiles
+
+
+METADATA_PATH = os.path.join("data", "ticker_metadata.csv")
+METADATA_COLUMNS = ["symbol", "shortName", "sector", "industry", "marketCap"]
+
+# FMP profile field for each metadata column
+PROFILE_FIELDS = {"shortName": "companyName", "sector": "sector", "industry": "industry", "marketCap": "marketCap"}
+
+_lock = threading.Lock()
+_table = None
+
+
+def _load() -> pd.DataFrame:
+    global _table
+    if _table is None:
+        if os.path.exists(METADATA_PATH):
+            # Tables written before a column was added get it empty, to be filled on lookup
+            _table = pd.read_csv(METADATA_PATH).set_index("symbol").reindex(columns=METADATA_COLUMNS[1:])
+        else:
+            _table = pd.DataFrame(columns=METADATA_COLUMNS).set_index("symbol")
+    return _table
+
+
+def _save(table: pd.DataFrame):
+    os.makedirs(os.path.dirname(METADATA_PATH), exist_ok=True)
+    tmp_path = f"{METADATA_PATH}.{os.getpid()}.tmp"
+    table.reset_index().to_csv(tmp_path, index=False)
+    os.replace(tmp_path, METADATA_PATH)
+
+
+def update_from_profiles(profiles: dict):
+    """Store metadata from FMP profiles keyed by symbol."""
+    global _table
+    if not profiles:
+        return
+    rows = pd.DataFrame.from_dict(
+        {sym: {col: p.get(field) for col, field in PROFILE_FIELDS.items()} for sym, p in profiles.items()},
+        orient="index",
+    )
+    rows.index.name = "symbol"
+    with _lock:
+        table = _load()
+        table = pd.concat([table[~table.index.isin(rows.index)], rows]).sort_index()
+        _save(table)
+        _table = table
+
+
+def _lookup(symbols: list, column: str) -> pd.DataFrame:
+    """The table after fetching profiles for the symbols that have no `column` yet."""
+    with _lock:
+        table = _load()
+        missing = [s for s in symbols if s not in table.index or pd.isna(table.at[s, column])]
+
+    if missing:
+        try:
+            update_from_profiles(fetch_profiles(missing))
+        except Exception:
+            pass
+
+    with _lock:
+        return _load()
+
+
+def get_metadata(symbols: list) -> pd.DataFrame:
+    """Metadata rows for the symbols, indexed by symbol; symbols FMP does not know are left out."""
+    symbols = [s.upper() for s in symbols]
+    table = _lookup(symbols, "sector")
+    return table[table.index.isin(symbols)].copy()
+
+
+def stored_metadata(symbols: list) -> pd.DataFrame:
+    """Like get_metadata, from what is already stored and without fetching anything."""
+    symbols = [s.upper() for s in symbols]
+    with _lock:
+        table = _load()
+    return table[table.index.isin(symbols)].copy()
+
+
+def get_short_names(symbols: list) -> dict:
+    """Display name per symbol, falling back to the symbol itself."""
+    symbols = [s.upper() for s in symbols]
+    table = _lookup(symbols, "shortName")
+    names = {}
+    for s in symbols:
+        name = table.at[s, "shortName"] if s in table.index else None
+        names[s] = s if pd.isna(name) else name
+    return names
@@ -0,0 +1,183 @@
+"""Sliding-window datasets that never materialise the windows.
+
+    python window_dataset.py --tickers 100 --window 10 --workers 4 --epochs 1
+    python window_dataset.py --archive                  # read prices from history_archive.py
+
+All tickers' per-day rows sit in one contiguous float32 array, ticker
+after ticker. A sample is a window of `window` consecutive rows from one
+ticker plus the target `horizon` rows after it, and is served as a view
+of that array, so the dataset costs one copy of the history instead of
+`window` copies. A batch is gathered from a sliding_window_view in one
+fancy-indexing step, which is the only copy made.
+
+build_volume_lag_arrays() lays out the volume model's inputs described
+on page4: log volume (lag_1 ... lag_10 once windowed), the 7-day moving
+average and standard deviation of raw volume, and calendar columns; the
+target is the next day's log volume.
+
+The 30-day windows built by features.py are not a fit for this: their
+Momentum and Volatility_5d are computed inside each window, so the same
+day has different values in different windows.
+
+DataLoader workers are forked, so they read the parent's array through
+shared copy-on-write pages rather than pickled copies.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+
+VOLUME_LAGS = 10
+ROLLING_DAYS = 7
+
+LAG_COLUMNS = ["log_volume", "volume_ma7", "volume_std7", "weekday", "month", "is_month_end"]
+
+
+def build_volume_lag_arrays(prices: dict) -> tuple:
+    """(data, offsets): data is (rows, len(LAG_COLUMNS)) float32, ticker i owns rows offsets[i]:offsets[i + 1]."""
+    blocks = []
+    for df in prices.values():
+        if df is None or df.empty:
+            continue
+        volume = df["Volume"].dropna()
+        rolling = volume.rolling(ROLLING_DAYS)
+        index = pd.DatetimeIndex(volume.index)
+        block = np.column_stack([
+            np.log1p(volume.to_numpy(np.float64)),
+            np.log1p(rolling.mean().to_numpy()),
+            np.log1p(rolling.std().to_numpy()),
+            index.weekday / 6.0,
+            (index.month - 1) / 11.0,
+            index.is_month_end.astype(np.float64),
+        ])[ROLLING_DAYS - 1:]    # the first rows have no full rolling window
+        if len(block):
+            blocks.append(block.astype(np.float32))
+
+    offsets = np.cumsum([0] + [len(b) for b in blocks])
+    data = np.concatenate(blocks) if blocks else np.empty((0, len(LAG_COLUMNS)), np.float32)
+    return np.ascontiguousarray(data), offsets
+
+
+class SlidingWindowDataset(Dataset):
+    """(window, features) inputs and a scalar target, as views of one (rows, features) array.
+
+    offsets delimit each ticker's rows so no window crosses tickers.
+    target_col is the column whose value `horizon` rows after the
+    window is the target.
+    """
+
+    def __init__(self, data: np.ndarray, offsets, window: int = VOLUME_LAGS,
+                 target_col: int = 0, horizon: int = 1):
+        self.data = np.ascontiguousarray(data, dtype=np.float32)
+        self.window = window
+        self.horizon = horizon
+        self.target_col = target_col
+        # Start row of every window with its target inside the same ticker
+        self.starts = np.concatenate([
+            np.arange(a, b - window - horizon + 1, dtype=np.int64)
+            for a, b in zip(offsets[:-1], offsets[1:]) if b - a >= window + horizon
+        ] or [np.empty(0, np.int64)])
+        self._windows = np.lib.stride_tricks.sliding_window_view(self.data, window, axis=0)  # (rows - w + 1, F, w)
+        self._targets = self.data[:, target_col]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int):
+        s = self.starts[i]
+        return torch.from_numpy(self.data[s:s + self.window]), torch.tensor(self._targets[s + self.window - 1 + self.horizon])
+
+    def __getitems__(self, indices: list):
+        # Whole batch in one gather: (batch, F, window) -> (batch, window, F)
+        s = self.starts[np.asarray(indices)]
+        X = np.ascontiguousarray(self._windows[s].transpose(0, 2, 1))
+        y = self._targets[s + self.window - 1 + self.horizon]
+        return torch.from_numpy(X), torch.from_numpy(y.copy())
+
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.starts.nbytes
+
+    def materialised_nbytes(self) -> int:
+        """What the same samples would cost as one (N, window, F) array."""
+        return len(self) * self.window * self.data.shape[1] * self.data.itemsize
+
+
+def _collate(batch):
+    # __getitems__ already returns a stacked (X, y); single samples still get stacked
+    if isinstance(batch, tuple):
+        return batch
+    X, y = zip(*batch)
+    return torch.stack(X), torch.stack(y)
+
+
+def make_loader(dataset: SlidingWindowDataset, batch_size: int = 512, workers: int = 0,
+                shuffle: bool = True) -> DataLoader:
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=workers,
+        persistent_workers=workers > 0,
+        collate_fn=_collate,
+        multiprocessing_context="fork" if workers > 0 else None,
+    )
+
+
+def train(model: torch.nn.Module, loader: DataLoader, epochs: int = 1, lr: float = 1e-3) -> list:
+    """Plain MSE training loop; returns the mean loss of each epoch."""
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = torch.nn.MSELoss()
+    model.train()
+    losses = []
+    for _ in range(epochs):
+        total, batches = 0.0, 0
+        for X, y in loader:
+            optimizer.zero_grad()
+            loss = loss_fn(model(X)[:, 0], y)
+            loss.backward()
+            optimizer.step()
+            total += loss.item()
+            batches += 1
+        losses.append(total / max(batches, 1))
+    model.eval()
+    return losses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=100, help="first n tickers of sp500.csv")
+    parser.add_argument("--window", type=int, default=VOLUME_LAGS)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--archive", action="store_true", help="read prices from the history archive as built")
+    args = parser.parse_args()
+
+    from history_archive import open_archive
+    from model import LSTMVolumePredictor
+    from price_store import get_price_store
+
+    tickers = pd.read_csv("sp500.csv")["ticker"].dropna().tolist()[:args.tickers]
+    archive = open_archive() if args.archive else None
+    if args.archive and archive is None:
+        parser.error("no history archive; build it with python history_archive.py")
+    if archive is not None:
+        data, offsets = build_volume_lag_arrays({t: archive.frame(t) for t in tickers if t in archive})
+    else:
+        store = get_price_store()
+        store.history_many(tickers, interval="1d", days=1, backfill=True)    # fill, then read everything stored
+        data, offsets = build_volume_lag_arrays({t: store.stored(t) for t in tickers})
+
+    dataset = SlidingWindowDataset(data, offsets, window=args.window)
+    print(f"{len(dataset):,} windows of {args.window} x {data.shape[1]}: "
+          f"{dataset.nbytes() / 2 ** 20:.1f} MiB as views vs {dataset.materialised_nbytes() / 2 ** 20:.1f} MiB materialised")
+
+    model = LSTMVolumePredictor(input_size=data.shape[1])
+    start = time.perf_counter()
+    losses = train(model, make_loader(dataset, args.batch_size, args.workers), args.epochs)
+    print(f"{args.epochs} epoch(s) in {time.perf_counter() - start:.1f}s, loss per epoch: "
+          + ", ".join(f"{loss:.4f}" for loss in losses))